@@ -0,0 +1,141 @@
+"""
+Synthetic Cline task log generator for the CCC benchmarks.
+
+Writes task folders (task_metadata.json + ui_messages.json) shaped like the ones
+Cline stores, under <home>/.vscode-server/data/User/globalStorage/saoudrizwan.claude-dev/tasks,
+so both calculate_token_usage and an end-to-end CCC.py run can be pointed at them.
+"""
+import os
+import json
+import random
+import argparse
+from pathlib import Path
+
+TASKS_SUBDIR = Path(".vscode-server/data/User/globalStorage/saoudrizwan.claude-dev/tasks")
+
+MODEL_IDS = {
+    'claude-sonnet-4': "claude-sonnet-4-20250514",
+    'claude-opus-4': "claude-opus-4-20250514",
+    'claude-3-7-sonnet': "claude-3-7-sonnet-20250219",
+    'claude-3-5-sonnet': "claude-3-5-sonnet-20241022",
+    'claude-3-5-haiku': "claude-3-5-haiku-20241022"
+}
+
+DEFAULT_MIX = "claude-sonnet-4:6,claude-opus-4:2,claude-3-7-sonnet:1,claude-3-5-haiku:1"
+
+FILLER_WORDS = ("const", "return", "function", "import", "the", "file", "\"quoted\"", "path\\to\\file",
+                "{", "}", "[", "]", "\n", "async", "await", "self", "def", "class", "<task>", "</task>")
+
+def parse_model_mix(mix):
+    """Parse 'model:weight,model:weight' into (model ids, weights)"""
+    model_ids = []
+    weights = []
+    for item in mix.split(','):
+        name, _, weight = item.partition(':')
+        name = name.strip()
+        model_ids.append(MODEL_IDS.get(name, name))
+        weights.append(float(weight) if weight else 1.0)
+    return model_ids, weights
+
+def filler_text(rng, size):
+    """Roughly `size` characters of code-like text with quotes, escapes and brackets"""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(FILLER_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+def generate_task(rng, folder, start_ts, requests, payload_size, model_ids, weights, switch_rate, claude_code_rate):
+    """Write one task folder; returns (api requests written, bytes written)"""
+    provider = 'claude-code' if rng.random() < claude_code_rate else 'anthropic'
+    model_usage = [{'ts': start_ts, 'model_id': rng.choices(model_ids, weights)[0],
+                    'model_provider_id': provider, 'mode': 'act'}]
+
+    ts = start_ts
+    workspace = f"/home/user/projects/project-{rng.randint(1, 25)}"
+    messages = [{'ts': ts, 'type': 'say', 'say': 'task', 'text': filler_text(rng, payload_size // 4)}]
+    context_tokens = 0
+    for _ in range(requests):
+        ts += rng.randint(2_000, 90_000)
+        if rng.random() < switch_rate:
+            model_usage.append({'ts': ts, 'model_id': rng.choices(model_ids, weights)[0],
+                                'model_provider_id': provider, 'mode': rng.choice(('plan', 'act'))})
+
+        context_tokens = min(context_tokens + rng.randint(500, 8_000), 180_000)
+        cache_writes = rng.randint(0, 12_000)
+        messages.append({
+            'ts': ts, 'type': 'say', 'say': 'api_req_started',
+            'text': json.dumps({
+                'request': f"<task>\n{filler_text(rng, payload_size // 2)}\n</task>\n\n"
+                           f"# Current Working Directory ({workspace}) Files\n",
+                'tokensIn': rng.randint(1, 400),
+                'tokensOut': rng.randint(50, 4_000),
+                'cacheWrites': cache_writes,
+                'cacheReads': max(context_tokens - cache_writes, 0),
+                'cost': round(rng.uniform(0.001, 0.25), 6)
+            })
+        })
+        ts += rng.randint(500, 30_000)
+        messages.append({'ts': ts, 'type': 'say', 'say': 'text', 'text': filler_text(rng, payload_size), 'partial': False})
+        if rng.random() < 0.5:
+            ts += rng.randint(100, 5_000)
+            messages.append({'ts': ts, 'type': 'ask', 'ask': 'tool',
+                             'text': json.dumps({'tool': 'editedExistingFile', 'path': 'src/app.py',
+                                                 'diff': filler_text(rng, payload_size)})})
+
+    folder.mkdir(parents=True, exist_ok=True)
+    metadata = json.dumps({'files_in_context': [], 'model_usage': model_usage})
+    ui_messages = json.dumps(messages)
+    (folder / "task_metadata.json").write_text(metadata, encoding='utf-8')
+    (folder / "ui_messages.json").write_text(ui_messages, encoding='utf-8')
+    return requests, len(metadata) + len(ui_messages)
+
+def generate_corpus(home, tasks=1000, requests=25, payload_size=400, model_mix=DEFAULT_MIX,
+                    switch_rate=0.02, claude_code_rate=0.9, days=180, seed=0):
+    """
+    Generate a synthetic tasks directory under `home`. Requests per task vary
+    around `requests`, and task start times are spread over the last `days` days.
+    Returns (tasks directory, api requests written, bytes written).
+    """
+    rng = random.Random(seed)
+    model_ids, weights = parse_model_mix(model_mix)
+    tasks_dir = Path(home) / TASKS_SUBDIR
+    tasks_dir.mkdir(parents=True, exist_ok=True)
+
+    end_ts = 1_750_000_000_000
+    span = days * 86_400_000
+    total_requests = 0
+    total_bytes = 0
+    for start_ts in sorted(rng.sample(range(end_ts - span, end_ts), tasks)):
+        task_requests = max(1, int(rng.expovariate(1 / requests))) if requests else 0
+        written_requests, written_bytes = generate_task(
+            rng, tasks_dir / str(start_ts), start_ts, task_requests, payload_size,
+            model_ids, weights, switch_rate, claude_code_rate
+        )
+        total_requests += written_requests
+        total_bytes += written_bytes
+    return tasks_dir, total_requests, total_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Cline task logs for benchmarking CCC')
+    parser.add_argument('home', help='Directory used as HOME; tasks are written under its .vscode-server folder')
+    parser.add_argument('--tasks', type=int, default=1000, help='Number of task folders (default: 1000)')
+    parser.add_argument('--requests', type=int, default=25, help='Mean api requests per task (default: 25)')
+    parser.add_argument('--payload-size', type=int, default=400, help='Approximate characters of text per message (default: 400)')
+    parser.add_argument('--model-mix', default=DEFAULT_MIX, help=f'Weighted models, e.g. "{DEFAULT_MIX}"')
+    parser.add_argument('--switch-rate', type=float, default=0.02, help='Chance of a model switch before each request (default: 0.02)')
+    parser.add_argument('--claude-code-rate', type=float, default=0.9, help='Share of tasks using the claude-code provider (default: 0.9)')
+    parser.add_argument('--days', type=int, default=180, help='Days the tasks are spread over (default: 180)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    tasks_dir, requests, size = generate_corpus(
+        os.path.expanduser(args.home), args.tasks, args.requests, args.payload_size, args.model_mix,
+        args.switch_rate, args.claude_code_rate, args.days, args.seed
+    )
+    print(f"Wrote {args.tasks:,} tasks, {requests:,} requests, {size / 1_048_576:,.1f} MB to {tasks_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmarks for CCC's scan, aggregation and rendering paths.
+
+Generates a synthetic corpus (or reuses one given with --home) and times
+calculate_token_usage (serial, parallel, cold and warm scan cache),
+calculate_daily_usage_stats, calculate_monthly_costs and an end-to-end CCC.py
+run, reporting requests/s, MB/s and peak RSS for each. Every benchmark runs in
+its own process, so each peak RSS is measured on its own.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+import ccc_core
+from generate_tasks import TASKS_SUBDIR, DEFAULT_MIX, generate_corpus
+
+def peak_rss_mb(who='self'):
+    """Peak resident set size in MB of this process or its children, None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return usage.ru_maxrss / (1_048_576 if sys.platform == 'darwin' else 1024)
+
+def corpus_size(tasks_dir):
+    """Total bytes of every task_metadata.json and ui_messages.json"""
+    total = 0
+    for folder in Path(tasks_dir).iterdir():
+        for name in ("task_metadata.json", "ui_messages.json"):
+            try:
+                total += os.path.getsize(folder / name)
+            except OSError:
+                pass
+    return total
+
+def best_of(repeat, func):
+    """Run func `repeat` times and return (fastest seconds, last result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def bench_phase(home, phase, jobs, repeat):
+    """
+    Time one benchmark against the corpus under `home` in this process. Returns
+    its seconds, requests, whether MB/s applies, this process's peak RSS and the
+    corpus counts of the scan it ran
+    """
+    tasks_dir = Path(home) / TASKS_SUBDIR
+    scan = lambda **kwargs: ccc_core.calculate_token_usage(tasks_dir, silent=True, **kwargs)
+
+    if phase in ('daily stats', 'monthly costs'):
+        # The stats run on a scan's request data, which is built untimed first
+        model_totals, file_count, entry_count, skipped_count, timestamps, request_data = scan()
+        model_costs, _ = ccc_core.calculate_model_cost(model_totals)
+        stats = ccc_core.calculate_daily_usage_stats if phase == 'daily stats' else ccc_core.calculate_monthly_costs
+        seconds, _ = best_of(repeat, lambda: stats(request_data, model_costs))
+        requests, with_bytes = len(request_data), False
+    elif phase in ('scan (cache cold)', 'scan (cache warm)'):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = Path(cache_dir) / "scan-cache.sqlite3"
+
+            def cached_scan(rebuild):
+                cache = ccc_core.ScanCache(cache_path, rebuild=rebuild)
+                try:
+                    return scan(cache=cache, jobs=jobs)
+                finally:
+                    cache.close()
+
+            if phase == 'scan (cache warm)':
+                cached_scan(True)
+            seconds, usage = best_of(repeat, lambda: cached_scan(phase == 'scan (cache cold)'))
+        model_totals, file_count, entry_count, skipped_count, timestamps, request_data = usage
+        requests, with_bytes = entry_count, True
+    else:
+        seconds, usage = best_of(repeat, lambda: scan(jobs=jobs if phase.startswith('scan (jobs') else 1))
+        model_totals, file_count, entry_count, skipped_count, timestamps, request_data = usage
+        requests, with_bytes = entry_count, True
+
+    return {
+        'seconds': seconds,
+        'requests': requests,
+        'with_bytes': with_bytes,
+        'peak_rss_mb': peak_rss_mb(),
+        'corpus': {'files': file_count, 'skipped': skipped_count, 'requests': entry_count}
+    }
+
+def run_benchmarks(home, jobs, repeat):
+    """
+    Time every benchmarked path against the corpus under `home`, each in its own
+    process so its peak RSS is its own rather than the highest of the runs before it
+    """
+    tasks_dir = Path(home) / TASKS_SUBDIR
+    size = corpus_size(tasks_dir)
+    results = []
+    corpus = None
+
+    def record(name, seconds, requests, with_bytes=True, rss=None):
+        results.append({
+            'name': name,
+            'seconds': seconds,
+            'requests_per_s': requests / seconds if seconds else None,
+            'mb_per_s': size / 1_048_576 / seconds if seconds and with_bytes else None,
+            'peak_rss_mb': rss
+        })
+
+    phases = ['scan (serial)'] + ([f'scan (jobs={jobs})'] if jobs > 1 else []) + [
+        'scan (cache cold)', 'scan (cache warm)', 'daily stats', 'monthly costs']
+    for phase in phases:
+        command = [sys.executable, str(Path(__file__).resolve()), '--home', str(home), '--phase', phase,
+                   '--jobs', str(jobs), '--repeat', str(repeat)]
+        result = json.loads(subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout)
+        record(phase, result['seconds'], result['requests'], result['with_bytes'], result['peak_rss_mb'])
+        if corpus is None:
+            corpus = result['corpus']
+
+    # End to end: the real CLI on the corpus, with the cache kept out of the user's
+    with tempfile.TemporaryDirectory() as cache_home:
+        env = dict(os.environ, HOME=str(home), USERPROFILE=str(home), XDG_CACHE_HOME=cache_home,
+                   COLUMNS="120", PYTHONIOENCODING="utf-8")
+        # --path keeps inherited XDG_CONFIG_HOME or APPDATA locations from adding the user's real logs
+        command = [sys.executable, str(BENCH_DIR.parent / "CCC.py"), "--no-cache", "--jobs", str(jobs),
+                   "--path", str(tasks_dir)]
+
+        def end_to_end():
+            subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+        seconds, _ = best_of(repeat, end_to_end)
+        record('main() end to end', seconds, corpus['requests'], rss=peak_rss_mb('children'))
+
+    corpus = dict(corpus, bytes=size)
+    return corpus, results
+
+def format_results(corpus, results):
+    """Plain-text report of the corpus and the timing of every benchmark"""
+    lines = [
+        f"Corpus: {corpus['files']:,} tasks ({corpus['skipped']:,} skipped), "
+        f"{corpus['requests']:,} requests, {corpus['bytes'] / 1_048_576:,.1f} MB",
+        "",
+        f"{'Benchmark':<22}{'Time (s)':>10}{'Requests/s':>14}{'MB/s':>10}{'Peak RSS (MB)':>16}"
+    ]
+    for result in results:
+        requests_per_s = f"{result['requests_per_s']:,.0f}" if result['requests_per_s'] else "-"
+        mb_per_s = f"{result['mb_per_s']:,.1f}" if result['mb_per_s'] else "-"
+        peak_rss = f"{result['peak_rss_mb']:,.0f}" if result['peak_rss_mb'] is not None else "-"
+        lines.append(f"{result['name']:<22}{result['seconds']:>10.3f}{requests_per_s:>14}{mb_per_s:>10}{peak_rss:>16}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CCC against a synthetic Cline task corpus')
+    parser.add_argument('--home', help='Reuse a corpus generated by generate_tasks.py under this HOME instead of generating one')
+    parser.add_argument('--tasks', type=int, default=2000, help='Number of generated task folders (default: 2000)')
+    parser.add_argument('--requests', type=int, default=25, help='Mean api requests per generated task (default: 25)')
+    parser.add_argument('--payload-size', type=int, default=400, help='Approximate characters of text per message (default: 400)')
+    parser.add_argument('--model-mix', default=DEFAULT_MIX, help=f'Weighted models, e.g. "{DEFAULT_MIX}"')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Processes for the parallel scans (default: CPU count)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the fastest is reported (default: 3)')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON, for comparing runs')
+    parser.add_argument('--phase', help=argparse.SUPPRESS)  # run one benchmark and print its result as JSON
+    args = parser.parse_args()
+
+    if args.phase:
+        print(json.dumps(bench_phase(os.path.expanduser(args.home), args.phase, max(args.jobs, 1), max(args.repeat, 1))))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_home:
+        home = Path(os.path.expanduser(args.home)) if args.home else Path(temp_home)
+        if not args.home:
+            print(f"Generating {args.tasks:,} tasks...", flush=True)
+            generate_corpus(home, args.tasks, args.requests, args.payload_size, args.model_mix, seed=args.seed)
+
+        corpus, results = run_benchmarks(home, max(args.jobs, 1), max(args.repeat, 1))
+
+    print(format_results(corpus, results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'version': ccc_core.VERSION, 'corpus': corpus, 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
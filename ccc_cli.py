@@ -0,0 +1,1125 @@
+"""
+Command-line layer of CCC: argument parsing, the rich and plain-text reports
+and their exports, --watch, serve and merge. Scanning, pricing and aggregation
+live in ccc_core; --pricing rebinds its tables, so they are read from there.
+"""
+import os
+import json
+import math
+from pathlib import Path
+
+import ccc_core
+from ccc_core import (
+    LiveUsage, MIXED_TIMEZONES, PhaseTimings, RANKING_KEYS, RANKING_TITLES, RequestExporter, SCAN_ERRORS, ScanBudget,
+    ScanCache, ScanFilter, TaskRanking, UsageAggregator, VERSION, WHAT_IF_PRESETS, build_report, build_usage_summary,
+    calculate_model_cost, calculate_rolling_windows, calculate_token_usage, discover_task_roots, get_model_name,
+    load_pricing_file, merge_summaries, open_tasks_watcher, parse_plan_limits, parse_time_bound, parse_timezone,
+    parse_what_if, report_to_json, simulate_plans, summarize_monthly_groups, today_cost, usage_query, use_pricing,
+    write_summary
+)
+
+def build_watch_dashboard(live_usage, watcher_name):
+    """Renderable for the --watch dashboard: today's spend, this month and the model distribution"""
+    from datetime import datetime
+    from rich.console import Group
+    from rich.table import Table
+    from rich.panel import Panel
+    from rich import box
+    
+    aggregator = live_usage.aggregate()
+    model_costs, total_calculated_cost = calculate_model_cost(aggregator.model_totals)
+    now = datetime.now()
+    today = aggregator.days.get(now.date(), [0, 0, 0, 0, 0, 0.0])
+    month = aggregator.months.get(now.strftime('%Y-%m'), [0, 0, 0, 0, 0, 0.0])
+    
+    status_content = f"""[bold]Today:[/bold] [bright_green]${today[5]:.4f}[/bright_green] [dim]({today[0]:,} API calls, {today[1] + today[2]:,} tokens)[/dim]
+[bold]This month:[/bold] [bright_green]${month[5]:.4f}[/bright_green] [dim]({month[0]:,} API calls, {month[1] + month[2]:,} tokens)[/dim]
+[bold]All time:[/bold] [bright_green]${total_calculated_cost:.4f}[/bright_green]
+[dim]Watching {len(live_usage.tasks):,} task folders via {watcher_name} · updated {now.strftime('%H:%M:%S')} · Ctrl+C to stop[/dim]"""
+    
+    renderables = [Panel(status_content, title="👀 Live Usage", border_style="blue", width=80)]
+    
+    if any(m['count'] > 0 for m in aggregator.model_totals.values()):
+        model_table = Table(title="🤖 Model Distribution", box=box.ROUNDED, show_header=True, header_style="bold magenta", width=80)
+        model_table.add_column("Model", style="cyan", no_wrap=True)
+        model_table.add_column("API Calls", style="bright_white", justify="right")
+        model_table.add_column("Tokens", style="bright_white", justify="right")
+        model_table.add_column("Cost", style="bright_green", justify="right")
+        
+        for model_type, totals in aggregator.model_totals.items():
+            if totals['count'] > 0:
+                total_tokens = totals['tokensIn'] + totals['tokensOut']
+                cost = model_costs[model_type]['calculated_cost']
+                model_table.add_row(get_model_name(model_type), f"{totals['count']:,}", f"{total_tokens:,}", f"${cost:.4f}")
+        renderables.append(model_table)
+    
+    return Group(*renderables)
+
+def watch_usage(console, base_paths, cache=None, jobs=1, interval=2.0, aggregator=None):
+    """Keep a live dashboard up to date as Cline writes to the tasks directories"""
+    from rich.live import Live
+    
+    # Watching starts before the initial scan, so tasks written during it are reported
+    watcher = open_tasks_watcher(base_paths)
+    try:
+        live_usage = LiveUsage(base_paths, cache=cache, jobs=jobs, aggregator=aggregator)
+    except BaseException:
+        watcher.close()
+        raise
+    pending = set()
+    
+    try:
+        with Live(build_watch_dashboard(live_usage, watcher.name), console=console, refresh_per_second=1) as live:
+            while True:
+                pending = live_usage.refresh_changed(watcher.changes(interval), pending)
+                live.update(build_watch_dashboard(live_usage, watcher.name))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def serve_usage(base_paths, cache=None, jobs=1, interval=2.0, host='127.0.0.1', port=8765, socket_path=None,
+                aggregator=None):
+    """
+    Keep usage in memory, updated as Cline writes to the tasks directories, and
+    answer JSON queries over localhost HTTP or HTTP on a Unix socket until interrupted
+    """
+    import signal
+    import threading
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    watcher = open_tasks_watcher(base_paths)
+    try:
+        live_usage = LiveUsage(base_paths, cache=cache, jobs=jobs, aggregator=aggregator)
+    except BaseException:
+        watcher.close()
+        raise
+    # Queries and refreshes both touch the LiveUsage, one at a time
+    lock = threading.Lock()
+    
+    class UsageRequestHandler(BaseHTTPRequestHandler):
+        server_version = f"CCC/{VERSION}"
+        
+        def do_GET(self):
+            with lock:
+                status, body = usage_query(live_usage, self.path, watcher.name)
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    if socket_path is not None:
+        class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+        
+        # A socket left behind by a previous run that didn't shut down cleanly
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, UsageRequestHandler)
+        address = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), UsageRequestHandler)
+        address = f"http://{host}:{server.server_address[1]}"
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving usage of {len(live_usage.tasks):,} task folders on {address} (watching via {watcher.name}, Ctrl+C to stop)",
+          flush=True)
+    
+    # Stop on SIGTERM (service managers, kill) the way Ctrl+C does, so the socket and cache are cleaned up
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    previous_handler = signal.signal(signal.SIGTERM, stop)
+    
+    pending = set()
+    try:
+        while True:
+            changed = watcher.changes(interval)
+            with lock:
+                pending = live_usage.refresh_changed(changed, pending)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        server.shutdown()
+        server.server_close()
+        watcher.close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def print_merged_report(console, summary):
+    """Model distribution and monthly costs of a merged summary"""
+    from rich.table import Table
+    from rich.panel import Panel
+    from rich import box
+    
+    totals = summary['usage']['model_totals']
+    
+    console.print(Panel(f"""[bold]Summaries from:[/bold] {len(summary['hosts']):,} hosts ({len(set(summary['hosts'])):,} distinct)
+[bold]Files processed:[/bold] {summary['files']:,}
+[bold]API calls processed:[/bold] {summary['requests']:,}
+[bold]Total calculated cost:[/bold] [bright_green]${summary['total_calculated_cost']:.4f}[/bright_green]""",
+                        title="🧮 Merged Summary", border_style="blue", width=80))
+    console.print()
+    
+    if totals:
+        model_table = Table(title="🤖 Model Distribution", box=box.ROUNDED, show_header=True, header_style="bold magenta", width=80)
+        model_table.add_column("Model", style="cyan", no_wrap=True)
+        model_table.add_column("API Calls", style="bright_white", justify="right")
+        model_table.add_column("Tokens", style="bright_white", justify="right")
+        model_table.add_column("Cost", style="bright_green", justify="right")
+        
+        for model_type, model_totals in totals.items():
+            total_tokens = model_totals['tokensIn'] + model_totals['tokensOut']
+            cost = summary['model_costs'].get(model_type, 0.0)
+            model_table.add_row(get_model_name(model_type), f"{model_totals['count']:,}", f"{total_tokens:,}", f"${cost:.4f}")
+        
+        console.print(model_table)
+        console.print()
+    
+    monthly_costs = summarize_monthly_groups(summary['usage']['months'])
+    if monthly_costs:
+        monthly_table = Table(title="📅 Monthly Cost Breakdown", box=box.ROUNDED, show_header=True, header_style="bold green", width=80)
+        monthly_table.add_column("Month", style="cyan", no_wrap=True)
+        monthly_table.add_column("API Calls", style="bright_white", justify="right")
+        monthly_table.add_column("Total Tokens", style="bright_white", justify="right")
+        monthly_table.add_column("Total Cost", style="bright_green", justify="right")
+        
+        for month, data in sorted(monthly_costs.items()):
+            monthly_table.add_row(month, f"{data['api_calls']:,}", f"{data['total_tokens']:,}", f"${data['total_cost']:.4f}")
+        
+        console.print(monthly_table)
+        console.print()
+
+def merge_main(argv):
+    """`CCC.py merge`: combine --emit summaries from many machines into one"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog='CCC.py merge', description='Combine CCC summaries written with --emit into one org-wide summary')
+    parser.add_argument('summaries', nargs='+', help='Summary files (.json or .json.gz) or directories containing them')
+    parser.add_argument('-o', '--output', default='-', help='Merged summary file (.json or .json.gz), or - for stdout (default)')
+    args = parser.parse_args(argv)
+    
+    from rich.console import Console
+    
+    merged, failures = merge_summaries(args.summaries)
+    # Keep stdout clean for the JSON when writing it there
+    console = Console(stderr=args.output == '-')
+    for path, error in failures:
+        console.print(f"[yellow]Warning: Skipped {path}: {error}[/yellow]")
+    if len(merged['heatmap_timezones']) > 1:
+        console.print(f"[yellow]Warning: The summaries' heatmaps are in different time zones "
+                      f"({', '.join(merged['heatmap_timezones'])}), the merged one is labelled {MIXED_TIMEZONES}[/yellow]")
+    
+    write_summary(merged, args.output)
+    if args.output != '-':
+        console.print()
+        print_merged_report(console, merged)
+        console.print(f"[green]✅ Merged summary written to {args.output}[/green]")
+
+def serve_main(argv):
+    """`CCC.py serve`: a daemon answering usage queries from memory"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog='CCC.py serve', description='Keep usage in memory and answer JSON queries over localhost HTTP or a Unix socket')
+    parser.add_argument('--path', action='append', metavar='DIR', help='Cline tasks directory to watch, can be repeated (default: every known location found)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='HTTP port (default: 8765)')
+    parser.add_argument('--socket', metavar='FILE', help='Serve HTTP on this Unix socket instead of a TCP port')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between checks for changed tasks when polling (default: 2)')
+    parser.add_argument('--pricing', metavar='FILE', help='JSON or TOML file with model rates that override or extend the built-in pricing')
+    parser.add_argument('--tz', default='local', metavar='ZONE', help='Time zone of the weekday/hour heatmap in /report: local (default), UTC, an offset such as +02:00 or a name such as Europe/Paris')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every task folder at startup without using the scan cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='Discard the scan cache and re-parse every task folder')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of processes used for the initial scan (default: CPU count)')
+    args = parser.parse_args(argv)
+    
+    import socket
+    
+    if args.socket is not None and not hasattr(socket, 'AF_UNIX'):
+        parser.error("Unix sockets are not available on this platform, use --port")
+    if args.pricing:
+        try:
+            use_pricing(load_pricing_file(args.pricing))
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load pricing from {args.pricing}: {e}")
+    try:
+        aggregator = UsageAggregator(tz=parse_timezone(args.tz), tz_name=args.tz)
+    except ValueError as e:
+        parser.error(f"invalid --tz value: {e}")
+    
+    if args.path:
+        base_paths = [Path(os.path.expanduser(path)) for path in args.path]
+    else:
+        base_paths = discover_task_roots() or [Path(os.path.expanduser("~/.vscode-server/data/User/globalStorage/saoudrizwan.claude-dev/tasks"))]
+    
+    cache = None if args.no_cache else ScanCache(rebuild=args.rebuild_cache)
+    try:
+        serve_usage(base_paths, cache=cache, jobs=args.jobs, interval=args.interval, host=args.host, port=args.port,
+                    socket_path=args.socket, aggregator=aggregator)
+    except OSError as e:
+        parser.error(f"could not serve on {args.socket or f'{args.host}:{args.port}'}: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
+
+TIMING_PHASES = (
+    ('scan', 0), ('listing', 1), ('cache', 1), ('parsing', 1),
+    ('metadata', 2), ('ui_messages', 2), ('entry decode', 2), ('aggregation', 1), ('request export', 1),
+    ('summary', 0), ('rendering', 0), ('export', 0)
+)
+
+def build_timings_table(timings, jobs):
+    """Table of the time, share and calls of each phase, followed by counters and skip reasons"""
+    from rich.table import Table
+    from rich import box
+    
+    total = sum(timings.phases[name][0] for name, depth in TIMING_PHASES if depth == 0 and name in timings.phases)
+    
+    timings_table = Table(title="⏱️ Timings", box=box.ROUNDED, show_header=True, header_style="bold yellow", width=80)
+    timings_table.add_column("Phase", style="cyan")
+    timings_table.add_column("Time", style="bright_white", justify="right", no_wrap=True)
+    timings_table.add_column("Share", style="yellow", justify="right", no_wrap=True)
+    timings_table.add_column("Calls", style="bright_white", justify="right", no_wrap=True)
+    
+    for name, depth in TIMING_PHASES:
+        if name not in timings.phases:
+            continue
+        seconds, calls = timings.phases[name]
+        label = "  " * depth + name
+        if depth == 2 and jobs > 1:
+            label += " (all workers)"
+        share = f"{seconds / total * 100:.1f}%" if total else "-"
+        timings_table.add_row(label, f"{seconds:.3f}s", share, f"{calls:,}")
+    timings_table.add_row("[bold]Total", f"[bold]{total:.3f}s", "", "", end_section=True)
+    
+    for name, amount in timings.counters.items():
+        value = f"{amount / 1_048_576:,.1f} MB" if name.startswith('bytes') else f"{amount:,}"
+        timings_table.add_row(name.capitalize(), value, "", "")
+    for reason, amount in sorted(timings.skip_reasons.items()):
+        timings_table.add_row(f"Skipped: {reason}", f"{amount:,}", "", "")
+    return timings_table
+
+REPORT_TIPS = [
+    "💡 Tip: Monitor your daily usage patterns to identify your most productive coding sessions and peak activity periods",
+    "💡 Tip: Different Claude models excel at different tasks - track which models you use most for various coding activities",
+    "💡 Tip: Use the API call frequency and token patterns above to understand your coding workflow and productivity trends"
+]
+
+def describe_filters(scan_filter, args):
+    """One-line description of the active --since/--until/--task/--workspace filters"""
+    from datetime import datetime
+    
+    filters = []
+    if scan_filter.since is not None:
+        filters.append(f"from {datetime.fromtimestamp(scan_filter.since / 1000):%Y-%m-%d %H:%M}")
+    if scan_filter.until is not None:
+        filters.append(f"before {datetime.fromtimestamp(scan_filter.until / 1000):%Y-%m-%d %H:%M}")
+    if args.task:
+        filters.append(f"tasks {', '.join(args.task)}")
+    if args.workspace:
+        filters.append(f"workspace containing '{args.workspace}'")
+    return '; '.join(filters)
+
+def distribution_rows(distributions):
+    """(label, stats, is a cost) rows of the percentile table"""
+    rows = []
+    for scope, label in (('per_request', "API call"), ('per_day', "active day"), ('per_task', "task")):
+        rows.append((f"Tokens per {label}", distributions[scope]['tokens'], False))
+        rows.append((f"Cost per {label}", distributions[scope]['cost'], True))
+        if scope == 'per_request':
+            rows.append(("Context size per API call", distributions[scope]['context_size'], False))
+    return rows
+
+def format_distribution(stats, cost):
+    """p50, p90, p99 and max cells of a percentile table row"""
+    values = [stats['p50'], stats['p90'], stats['p99'], stats['max']]
+    return [f"${value:.4f}" if cost else f"{value:,.0f}" for value in values]
+
+def context_histogram_rows(distributions):
+    """(range label, API calls, share of all API calls) for each context size bin"""
+    histogram = distributions['context_histogram']
+    total = sum(bucket['requests'] for bucket in histogram) or 1
+    rows = []
+    for bucket in histogram:
+        if bucket['max'] is None:
+            label = f"{bucket['min'] // 1000}k+"
+        else:
+            label = f"{bucket['min'] // 1000}k - {bucket['max'] // 1000}k"
+        rows.append((label, bucket['requests'], bucket['requests'] / total))
+    return rows
+
+def format_ranking_rows(ranking):
+    """Table rows for the top tasks (workspace shortened to its folder name) and the top workspaces"""
+    from datetime import datetime
+    
+    task_rows = []
+    for task in ranking['top_tasks']:
+        started = datetime.fromtimestamp(task['first_ts'] / 1000).strftime('%Y-%m-%d') if task['first_ts'] else "-"
+        workspace = Path(task['workspace']).name if task['workspace'] else "-"
+        task_rows.append([task['task_id'], started, workspace, f"{task['requests']:,}", f"{task['tokens']:,}",
+                          f"${task['cost']:.4f}"])
+    workspace_rows = [
+        [totals['workspace'] or "(unknown)", f"{totals['tasks']:,}", f"{totals['requests']:,}", f"{totals['tokens']:,}",
+         f"${totals['cost']:.4f}"]
+        for totals in ranking['top_workspaces']
+    ]
+    return task_rows, workspace_rows
+
+def format_rolling_rows(rolling):
+    """Rolling window rows: spend now, the peak spend and when that window ended, with its API calls and tokens"""
+    from datetime import datetime
+    
+    return [
+        [window['window'], f"${window['current_cost']:.2f}", f"${window['peak_cost']:.2f}",
+         datetime.fromtimestamp(window['peak_end_ts'] / 1000).strftime('%Y-%m-%d %H:%M'),
+         f"{window['peak_requests']:,}", f"{window['peak_tokens']:,}"]
+        for window in rolling['windows']
+    ]
+
+HEATMAP_SHADES = ("·", "░", "▒", "▓", "█")
+HEATMAP_STYLES = ("dim", "green", "bright_green", "yellow", "bright_red")
+
+def heatmap_levels(heatmap, metric):
+    """Shade level (0 for none, 1-4 by quarter of the busiest hour) of every weekday/hour cell"""
+    values = heatmap[metric]
+    peak = max(max(row) for row in values)
+    return [[0 if not value else max(1, math.ceil(value * 4 / peak)) for value in row] for row in values]
+
+def format_heatmap_lines(heatmap, metric):
+    """(text, shade level) segments of each line of a weekday x hour grid, starting with the hour header"""
+    header = "    " + ''.join(f"{hour:>3}" if hour % 3 == 0 else "   " for hour in range(24))
+    lines = [[(header, None)]]
+    for weekday, levels in zip(heatmap['weekdays'], heatmap_levels(heatmap, metric)):
+        lines.append([(f"{weekday} ", None)] + [(f" {HEATMAP_SHADES[level] * 2}", level) for level in levels])
+    return lines
+
+def heatmap_legend(heatmap, metric):
+    """Shade scale of a heatmap in its metric's unit, plus the most expensive hour for the cost grid"""
+    peak = max(max(row) for row in heatmap[metric])
+    value = (lambda amount: f"${amount:,.2f}") if metric == 'cost' else (lambda amount: f"{amount:,.0f}")
+    lines = [f"{HEATMAP_SHADES[0]} none  " + "  ".join(f"{HEATMAP_SHADES[level]} ≤{value(peak * level / 4)}"
+                                                       for level in range(1, 5))]
+    if metric == 'cost':
+        busiest = heatmap['busiest']
+        lines.append(f"Busiest hour: {busiest['weekday']} {busiest['hour']:02d}:00-{(busiest['hour'] + 1) % 24:02d}:00, "
+                     f"${busiest['cost']:,.2f} over {busiest['requests']:,} API calls")
+    return lines
+
+def plan_comparison_caption(plans):
+    months = plans['months']
+    caption = (f"Over {len(months)} billed month{'s' if len(months) != 1 else ''} ({months[0]} to {months[-1]}). "
+               f"Pro bills Opus at API rates, Mixed takes the cheapest plan each month. ")
+    if not plans['limits']:
+        return caption + "Usage limits are not modeled (see --plan-limits)."
+    limits = ", ".join(f"{plan['name']} " + "/".join(f"${limit:,.0f}" for limit in plan['window_limits'].values())
+                       for plan in plans['plans'] if plan['window_limits'])
+    return caption + (f"! marks plans over the estimated {'/'.join(plans['limits'])} limits given with --plan-limits, "
+                      f"as API-rate spend ({limits}); Cheapest and Mixed skip them.")
+
+def format_plan_rows(plans):
+    """Plan comparison rows: each scenario's average monthly cost per plan and its cheapest plan within limits"""
+    names = {plan['key']: plan['name'] for plan in plans['plans']}
+    keys = [plan['key'] for plan in plans['plans']] + ['mixed']
+    rows = []
+    for scenario in plans['scenarios']:
+        over_limit = {key for keys in scenario['over_limit'].values() for key in keys}
+        rows.append([scenario['name']] +
+                    [f"${scenario['monthly_average'][key]:,.0f}{'!' if key in over_limit else ''}" for key in keys] +
+                    [names[scenario['best_plan']]])
+    return rows
+
+def format_plan_replay_rows(plans):
+    """Month by month cost of every plan under the first scenario, ! marking plans over their limits"""
+    names = {plan['key']: plan['name'] for plan in plans['plans']}
+    scenario = plans['scenarios'][0]
+    rows = []
+    for month, costs in scenario['monthly'].items():
+        over_limit = scenario['over_limit'].get(month, [])
+        cheapest = min((key for key in names if key not in over_limit), key=costs.__getitem__)
+        rows.append([month] + [f"${costs[key]:,.0f}{'!' if key in over_limit else ''}" for key in list(names) + ['mixed']] +
+                    [names[cheapest]])
+    return rows
+
+def render_header(console, base_paths, filters=None):
+    from rich.panel import Panel
+    
+    console.print()
+    console.print(Panel.fit("💰 [bold blue]Cline Claude Cost[/bold blue] 💰", 
+                          title="[bold green]CCC[/bold green]", 
+                          border_style="bright_blue"))
+    console.print()
+    
+    if len(base_paths) == 1:
+        console.print(f"[dim]Base path: {base_paths[0]}[/dim]")
+    else:
+        console.print("[dim]Base paths:[/dim]")
+        for base_path in base_paths:
+            console.print(f"[dim]  {base_path}[/dim]")
+    if filters:
+        console.print(f"[dim]Filters: {filters}[/dim]")
+    console.print()
+
+def render_report(console, report, tip=None):
+    """Print the report's rich tables and panels"""
+    from rich.table import Table
+    from rich.panel import Panel
+    from rich import box
+    
+    models = report['models']
+    combined_totals = report['combined_totals']
+    total_calculated_cost = report['total_calculated_cost']
+    entry_count = report['requests']
+    
+    # Model Distribution Table
+    if models:
+        model_table = Table(title="🤖 Model Distribution", box=box.ROUNDED, show_header=True, header_style="bold magenta", width=80)
+        model_table.add_column("Model", style="cyan", no_wrap=True)
+        model_table.add_column("API Calls", style="bright_white", justify="right")
+        model_table.add_column("Tokens", style="bright_white", justify="right")
+        model_table.add_column("Cost", style="bright_green", justify="right")
+        
+        for model in models:
+            totals = model['totals']
+            total_tokens = totals['tokensIn'] + totals['tokensOut']
+            model_table.add_row(model['name'], f"{totals['count']:,}", f"{total_tokens:,}", f"${model['calculated_cost']:.4f}")
+        
+        console.print(model_table)
+        console.print()
+    
+    # Usage Summary Table
+    summary_table = Table(title="📊 Usage Summary", box=box.ROUNDED, show_header=True, header_style="bold magenta", width=80)
+    summary_table.add_column("Metric", style="cyan", no_wrap=True)
+    summary_table.add_column("Value", style="bright_white", justify="right")
+    
+    summary_table.add_row("Files processed", f"{report['files']:,}")
+    summary_table.add_row("Files skipped (not Claude Code task)", f"[dim]{report['skipped']:,}[/dim]")
+    for category, count in report['errors'].items():
+        summary_table.add_row(f"Files with errors ({SCAN_ERRORS.get(category, category)})", f"[yellow]{count:,}[/yellow]")
+    summary_table.add_row("API calls processed", f"{entry_count:,}")
+    summary_table.add_row("Input tokens", f"{combined_totals['tokensIn']:,}")
+    summary_table.add_row("Output tokens", f"{combined_totals['tokensOut']:,}")
+    summary_table.add_row("Cache writes", f"{combined_totals['cacheWrites']:,}")
+    summary_table.add_row("Cache reads", f"{combined_totals['cacheReads']:,}")
+    
+    console.print(summary_table)
+    console.print()
+    
+    # Cost Breakdown by Model
+    for model in models:
+        model_name = model['name']
+        totals = model['totals']
+        rates = model['rates']
+        
+        cost_table = Table(title=f"💸 {model_name} Cost Breakdown", box=box.ROUNDED, show_header=True, header_style="bold green", width=80)
+        cost_table.add_column("Token Type", style="cyan", no_wrap=True)
+        cost_table.add_column("Count", style="bright_white", justify="right")
+        cost_table.add_column("Rate per 1M", style="yellow", justify="right")
+        cost_table.add_column("Cost", style="bright_green", justify="right")
+        
+        input_cost, output_cost, cache_write_cost, cache_read_cost = model['component_costs']
+        
+        cost_table.add_row("Input tokens", f"{totals['tokensIn']:,}", f"${rates['input_per_1M']:.2f}", f"${input_cost:.4f}")
+        cost_table.add_row("Output tokens", f"{totals['tokensOut']:,}", f"${rates['output_per_1M']:.2f}", f"${output_cost:.4f}")
+        cost_table.add_row("Cache writes", f"{totals['cacheWrites']:,}", f"${rates['cache_write_per_1M']:.2f}", f"${cache_write_cost:.4f}")
+        cost_table.add_row("Cache reads", f"{totals['cacheReads']:,}", f"${rates['cache_read_per_1M']:.2f}", f"${cache_read_cost:.4f}", end_section=True)
+        cost_table.add_row(f"[bold]{model_name} TOTAL", "", "", f"[bold bright_green]${model['calculated_cost']:.4f}[/bold bright_green]")
+        
+        console.print(cost_table)
+        console.print()
+    
+    # Combined Total
+    if len(models) > 1:
+        total_table = Table(title="💰 Combined Total", box=box.ROUNDED, show_header=True, header_style="bold red", width=80)
+        total_table.add_column("Metric", style="cyan", no_wrap=True)
+        total_table.add_column("Value", style="bright_white", justify="right")
+        
+        total_table.add_row("[bold]TOTAL CALCULATED COST", f"[bold bright_green]${total_calculated_cost:.4f}[/bold bright_green]")
+        
+        console.print(total_table)
+        console.print()
+
+    # Monthly Cost Breakdown
+    monthly_costs = report['monthly_costs']
+    if monthly_costs:
+        monthly_table = Table(title="📅 Monthly Cost Breakdown", box=box.ROUNDED, show_header=True, header_style="bold green", width=80)
+        monthly_table.add_column("Month", style="cyan", no_wrap=True)
+        monthly_table.add_column("API Calls", style="bright_white", justify="right")
+        monthly_table.add_column("Total Tokens", style="bright_white", justify="right")
+        monthly_table.add_column("Total Cost", style="bright_green", justify="right")
+        
+        # Months are sorted chronologically (oldest to newest)
+        for month, data in monthly_costs.items():
+            monthly_table.add_row(
+                month,
+                f"{data['api_calls']:,}",
+                f"{data['total_tokens']:,}",
+                f"${data['total_cost']:.4f}"
+            )
+        
+        console.print(monthly_table)
+        console.print()
+
+    # Usage Period Panel
+    period = report['period']
+    period_content = f"""[bold]Date range:[/bold] {period['date_range']}
+[bold]Time span:[/bold] {period['time_span']} days
+[bold]📊 Monthly average:[/bold] [bright_green]${period['monthly_average']:.2f}[/bright_green]"""
+    
+    console.print(Panel(period_content, title="📅 Usage Period", border_style="blue", width=80))
+    console.print()
+    
+    rolling = report['rolling']
+    if rolling is not None and rolling['windows'][0]['peak_end_ts'] is not None:
+        rolling_table = Table(title="⏱️ Rolling Windows", box=box.ROUNDED, show_header=True, header_style="bold blue", width=80)
+        rolling_table.add_column("Window", style="cyan", no_wrap=True)
+        rolling_table.add_column("Now", style="bright_green", justify="right")
+        rolling_table.add_column("Peak", style="bright_red", justify="right")
+        rolling_table.add_column("Peak ended", style="dim")
+        rolling_table.add_column("Peak API Calls", style="bright_white", justify="right")
+        rolling_table.add_column("Peak Tokens", style="bright_white", justify="right")
+        for row in format_rolling_rows(rolling):
+            rolling_table.add_row(*row)
+        console.print(rolling_table)
+        console.print()
+        
+        forecast = rolling['forecast']
+        forecast_content = f"""[bold]Spent so far in {forecast['month']}:[/bold] [bright_green]${forecast['month_to_date']:.2f}[/bright_green]
+[bold]Daily rate (last 7 days):[/bold] ${forecast['daily_rate']:.2f} [dim]over the {forecast['days_left']:.1f} days left[/dim]
+[bold]🔮 Month-end forecast:[/bold] [bright_green]${forecast['month_end']:.2f}[/bright_green]"""
+        console.print(Panel(forecast_content, title="🔮 Month-End Forecast", border_style="blue", width=80))
+        console.print()
+    
+    # Daily Usage Analysis
+    daily_stats = report['daily_stats']
+    if daily_stats:
+        daily_table = Table(title="📈 Daily Usage Analysis", box=box.ROUNDED, show_header=True, header_style="bold cyan", width=80)
+        daily_table.add_column("Metric", style="cyan", no_wrap=True)
+        daily_table.add_column("Value", style="bright_white", justify="right")
+        
+        daily_table.add_row("Active coding days", f"{daily_stats['total_active_days']}")
+        daily_table.add_row("Average cost per active day", f"${daily_stats['avg_daily_cost']:.4f}")
+        daily_table.add_row("Peak daily cost", f"[bright_red]${daily_stats['max_daily_cost']:.4f}[/bright_red]")
+        daily_table.add_row("Average daily tokens", f"{daily_stats['avg_daily_tokens']:,.0f}")
+        daily_table.add_row("Peak daily tokens", f"[bright_red]{daily_stats['max_daily_tokens']:,.0f}[/bright_red]")
+        daily_table.add_row("Average daily API calls", f"{daily_stats['avg_daily_requests']:.1f}")
+        daily_table.add_row("Peak daily API calls", f"[bright_red]{daily_stats['max_daily_requests']}[/bright_red]")
+        
+        if daily_stats['avg_daily_cost'] > 0:
+            peak_vs_avg = ((daily_stats['max_daily_cost'] - daily_stats['avg_daily_cost']) / daily_stats['avg_daily_cost']) * 100
+            variation_color = "bright_red" if peak_vs_avg > 100 else "yellow" if peak_vs_avg > 50 else "green"
+            daily_table.add_row("Peak day variation", f"[{variation_color}]{peak_vs_avg:.1f}% above average[/{variation_color}]")
+        
+        console.print(daily_table)
+        console.print()
+    
+    heatmap = report['heatmap']
+    if heatmap['busiest'] is not None:
+        from rich.text import Text
+        
+        for metric, title in (('cost', "Cost"), ('tokens', "Tokens")):
+            grid = Text()
+            for line in format_heatmap_lines(heatmap, metric):
+                for text, level in line:
+                    grid.append(text, style="bold cyan" if level is None else HEATMAP_STYLES[level])
+                grid.append("\n")
+            grid.append('\n'.join(heatmap_legend(heatmap, metric)), style="dim")
+            console.print(Panel(grid, title=f"🗓️ {title} by Weekday and Hour ({heatmap['timezone']})", border_style="blue", width=80))
+            console.print()
+    
+    distributions = report['distributions']
+    if distributions['per_request']['tokens']['count']:
+        percentile_table = Table(title="📐 Percentiles", box=box.ROUNDED, show_header=True, header_style="bold cyan", width=80)
+        percentile_table.add_column("Metric", style="cyan", no_wrap=True)
+        for column in ("p50", "p90", "p99", "Max"):
+            percentile_table.add_column(column, style="bright_white", justify="right")
+        for label, stats, cost in distribution_rows(distributions):
+            percentile_table.add_row(label, *format_distribution(stats, cost))
+        console.print(percentile_table)
+        console.print()
+        
+        histogram_table = Table(title="🧠 Context Size per API Call", box=box.ROUNDED, show_header=True, header_style="bold cyan", width=80)
+        histogram_table.add_column("Tokens in + cache reads", style="cyan", no_wrap=True)
+        histogram_table.add_column("API Calls", style="bright_white", justify="right")
+        histogram_table.add_column("Share", style="bright_white", justify="right")
+        histogram_table.add_column("", style="bright_blue", no_wrap=True)
+        for label, requests, share in context_histogram_rows(distributions):
+            histogram_table.add_row(label, f"{requests:,}", f"{share:.1%}", "█" * round(share * 30))
+        console.print(histogram_table)
+        console.print()
+    
+    ranking = report['ranking']
+    if ranking is not None and ranking['top_tasks']:
+        task_rows, workspace_rows = format_ranking_rows(ranking)
+        ranked_by = RANKING_TITLES[ranking['rank_by']]
+        top_table = Table(title=f"🔥 Top Tasks by {ranked_by}", box=box.ROUNDED, show_header=True, header_style="bold red", width=80)
+        top_table.add_column("Task", style="cyan", no_wrap=True)
+        top_table.add_column("Started", style="dim")
+        top_table.add_column("Workspace", style="bright_white")
+        top_table.add_column("API Calls", style="bright_white", justify="right")
+        top_table.add_column("Tokens", style="bright_white", justify="right")
+        top_table.add_column("Cost", style="bright_green", justify="right")
+        for row in task_rows:
+            top_table.add_row(*row)
+        console.print(top_table)
+        console.print()
+        
+        workspace_table = Table(title=f"📁 Top Workspaces by {ranked_by}", box=box.ROUNDED, show_header=True, header_style="bold red", width=80)
+        workspace_table.add_column("Workspace", style="cyan")
+        workspace_table.add_column("Tasks", style="bright_white", justify="right")
+        workspace_table.add_column("API Calls", style="bright_white", justify="right")
+        workspace_table.add_column("Tokens", style="bright_white", justify="right")
+        workspace_table.add_column("Cost", style="bright_green", justify="right")
+        for row in workspace_rows:
+            workspace_table.add_row(*row)
+        console.print(workspace_table)
+        console.print()
+    
+    plans = report['plans']
+    if plans is not None and plans['months']:
+        plan_names = [plan['name'] for plan in plans['plans']] + ["Mixed"]
+        caption = plan_comparison_caption(plans)
+        plan_table = Table(title="💳 Plan Comparison (average per month)", caption=caption, box=box.ROUNDED, show_header=True,
+                           header_style="bold green", width=80)
+        plan_table.add_column("Scenario", style="cyan")
+        for plan_name in plan_names:
+            plan_table.add_column(plan_name, style="bright_white", justify="right")
+        plan_table.add_column("Cheapest", style="bright_green")
+        for row in format_plan_rows(plans):
+            plan_table.add_row(*row)
+        console.print(plan_table)
+        console.print()
+        
+        replay_table = Table(title=f"📆 Monthly Plan Replay ({plans['scenarios'][0]['name']})", box=box.ROUNDED, show_header=True,
+                             header_style="bold green", width=80)
+        replay_table.add_column("Month", style="cyan", no_wrap=True)
+        for plan_name in plan_names:
+            replay_table.add_column(plan_name, style="bright_white", justify="right")
+        replay_table.add_column("Cheapest", style="bright_green")
+        for row in format_plan_replay_rows(plans):
+            replay_table.add_row(*row)
+        console.print(replay_table)
+        console.print()
+    
+    # Additional Statistics
+    total_tokens = report['total_tokens']
+    monthly_average = period['monthly_average']
+    
+    additional_table = Table(title="Additional Statistics", box=box.ROUNDED, show_header=True, header_style="bold white", width=80)
+    additional_table.add_column("Metric", style="cyan", no_wrap=True)
+    additional_table.add_column("Value", style="bright_white", justify="right")
+    
+    additional_table.add_row("Total tokens (in + out)", f"{total_tokens:,}")
+    additional_table.add_row("Total cache operations", f"{report['total_cache_ops']:,}")
+    additional_table.add_row("Calendar day average (monthly/30)", f"${monthly_average / 30:.4f}" if monthly_average > 0 else "$0.0000")
+    
+    if entry_count > 0:
+        avg_tokens_per_entry = total_tokens / entry_count
+        avg_cost_per_entry = total_calculated_cost / entry_count
+        additional_table.add_row("Average tokens per API call", f"{avg_tokens_per_entry:.1f}")
+        additional_table.add_row("Average cost per API call", f"${avg_cost_per_entry:.4f}")
+    
+    console.print(additional_table)
+    console.print()
+
+    if tip:
+        console.print(f"[dim]{tip}[/dim]")
+
+def format_plain_table(title, headers, rows):
+    """Fixed-width text table: first column left-aligned, the others right-aligned"""
+    rows = [headers] + [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+    lines = [title, '-' * len(title)]
+    for row in rows:
+        cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        lines.append('  '.join(cells).rstrip())
+    return '\n'.join(lines)
+
+def format_plain_report(report):
+    """The report as plain text, for pipes and logs"""
+    combined_totals = report['combined_totals']
+    period = report['period']
+    sections = [f"CCC {VERSION} - Cline Claude Cost"]
+    sections.append('\n'.join(f"Base path: {base_path}" for base_path in report['base_paths']) +
+                    (f"\nFilters: {report['filters']}" if report['filters'] else ''))
+    
+    if report['models']:
+        sections.append(format_plain_table("Model Distribution", ["Model", "API Calls", "Tokens", "Cost"], [
+            [model['name'], f"{model['totals']['count']:,}",
+             f"{model['totals']['tokensIn'] + model['totals']['tokensOut']:,}", f"${model['calculated_cost']:.4f}"]
+            for model in report['models']
+        ]))
+        sections.append(format_plain_table("Cost Breakdown", ["Model", "Input", "Output", "Cache Writes", "Cache Reads", "Total"], [
+            [model['name']] + [f"${cost:.4f}" for cost in model['component_costs']] + [f"${model['calculated_cost']:.4f}"]
+            for model in report['models']
+        ]))
+    
+    sections.append(format_plain_table("Usage Summary", ["Metric", "Value"], [
+        ["Files processed", f"{report['files']:,}"],
+        ["Files skipped (not Claude Code task)", f"{report['skipped']:,}"]
+    ] + [
+        [f"Files with errors ({SCAN_ERRORS.get(category, category)})", f"{count:,}"]
+        for category, count in report['errors'].items()
+    ] + [
+        ["API calls processed", f"{report['requests']:,}"],
+        ["Input tokens", f"{combined_totals['tokensIn']:,}"],
+        ["Output tokens", f"{combined_totals['tokensOut']:,}"],
+        ["Cache writes", f"{combined_totals['cacheWrites']:,}"],
+        ["Cache reads", f"{combined_totals['cacheReads']:,}"],
+        ["Total calculated cost", f"${report['total_calculated_cost']:.4f}"],
+        ["Date range", period['date_range']],
+        ["Time span", f"{period['time_span']} days"],
+        ["Monthly average", f"${period['monthly_average']:.2f}"]
+    ]))
+    
+    rolling = report['rolling']
+    if rolling is not None and rolling['windows'][0]['peak_end_ts'] is not None:
+        forecast = rolling['forecast']
+        sections.append(format_plain_table("Rolling Windows", ["Window", "Now", "Peak", "Peak ended", "Peak API Calls", "Peak Tokens"],
+                                           format_rolling_rows(rolling)))
+        sections.append(format_plain_table("Month-End Forecast", ["Metric", "Value"], [
+            [f"Spent so far in {forecast['month']}", f"${forecast['month_to_date']:.2f}"],
+            ["Daily rate (last 7 days)", f"${forecast['daily_rate']:.2f}"],
+            ["Days left", f"{forecast['days_left']:.1f}"],
+            ["Month-end forecast", f"${forecast['month_end']:.2f}"]
+        ]))
+    
+    if report['monthly_costs']:
+        sections.append(format_plain_table("Monthly Cost Breakdown", ["Month", "API Calls", "Total Tokens", "Total Cost"], [
+            [month, f"{data['api_calls']:,}", f"{data['total_tokens']:,}", f"${data['total_cost']:.4f}"]
+            for month, data in report['monthly_costs'].items()
+        ]))
+    
+    daily_stats = report['daily_stats']
+    if daily_stats:
+        sections.append(format_plain_table("Daily Usage Analysis", ["Metric", "Value"], [
+            ["Active coding days", f"{daily_stats['total_active_days']}"],
+            ["Average cost per active day", f"${daily_stats['avg_daily_cost']:.4f}"],
+            ["Peak daily cost", f"${daily_stats['max_daily_cost']:.4f}"],
+            ["Average daily tokens", f"{daily_stats['avg_daily_tokens']:,.0f}"],
+            ["Peak daily tokens", f"{daily_stats['max_daily_tokens']:,.0f}"],
+            ["Average daily API calls", f"{daily_stats['avg_daily_requests']:.1f}"],
+            ["Peak daily API calls", f"{daily_stats['max_daily_requests']}"]
+        ]))
+    
+    heatmap = report['heatmap']
+    if heatmap['busiest'] is not None:
+        for metric, title in (('cost', "Cost"), ('tokens', "Tokens")):
+            title = f"{title} by Weekday and Hour ({heatmap['timezone']})"
+            lines = [''.join(text for text, level in line).rstrip() for line in format_heatmap_lines(heatmap, metric)]
+            sections.append('\n'.join([title, '-' * len(title)] + lines + heatmap_legend(heatmap, metric)))
+    
+    distributions = report['distributions']
+    if distributions['per_request']['tokens']['count']:
+        sections.append(format_plain_table("Percentiles", ["Metric", "p50", "p90", "p99", "Max"], [
+            [label] + format_distribution(stats, cost) for label, stats, cost in distribution_rows(distributions)
+        ]))
+        sections.append(format_plain_table("Context Size per API Call", ["Tokens in + cache reads", "API Calls", "Share"], [
+            [label, f"{requests:,}", f"{share:.1%}"] for label, requests, share in context_histogram_rows(distributions)
+        ]))
+    
+    ranking = report['ranking']
+    if ranking is not None and ranking['top_tasks']:
+        task_rows, workspace_rows = format_ranking_rows(ranking)
+        ranked_by = RANKING_TITLES[ranking['rank_by']]
+        sections.append(format_plain_table(f"Top Tasks by {ranked_by}",
+                                           ["Task", "Started", "Workspace", "API Calls", "Tokens", "Cost"], task_rows))
+        sections.append(format_plain_table(f"Top Workspaces by {ranked_by}",
+                                           ["Workspace", "Tasks", "API Calls", "Tokens", "Cost"], workspace_rows))
+    
+    plans = report['plans']
+    if plans is not None and plans['months']:
+        plan_names = [plan['name'] for plan in plans['plans']] + ["Mixed"]
+        sections.append(format_plain_table("Plan Comparison (average per month)", ["Scenario"] + plan_names + ["Cheapest"],
+                                           format_plan_rows(plans)) + '\n' + plan_comparison_caption(plans))
+        sections.append(format_plain_table(f"Monthly Plan Replay ({plans['scenarios'][0]['name']})",
+                                           ["Month"] + plan_names + ["Cheapest"], format_plan_replay_rows(plans)))
+    return '\n\n'.join(sections)
+
+def format_plain_timings(timings, jobs):
+    """--timings as plain text"""
+    rows = []
+    for name, depth in TIMING_PHASES:
+        if name in timings.phases:
+            seconds, calls = timings.phases[name]
+            label = "  " * depth + name + (" (all workers)" if depth == 2 and jobs > 1 else "")
+            rows.append([label, f"{seconds:.3f}s", f"{calls:,}"])
+    rows.extend([name.capitalize(), f"{amount:,}", ""] for name, amount in timings.counters.items())
+    rows.extend([f"Skipped: {reason}", f"{amount:,}", ""] for reason, amount in sorted(timings.skip_reasons.items()))
+    return format_plain_table("Timings", ["Phase", "Time", "Calls"], rows)
+
+def export_report(report, tip, svg_path=None, html_path=None):
+    """
+    Render the report into its own recording console and save it as SVG and/or
+    HTML, so the terminal output never has to be recorded
+    """
+    import io
+    from rich.console import Console
+    
+    console = Console(record=True, file=io.StringIO(), width=100)
+    render_header(console, report['base_paths'], report['filters'])
+    render_report(console, report, tip)
+    if svg_path:
+        console.save_svg(svg_path, title="CCC Report", clear=False)
+    if html_path:
+        console.save_html(html_path, clear=False)
+
+def main():
+    import sys
+    
+    if sys.argv[1:2] == ['merge']:
+        merge_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['serve']:
+        serve_main(sys.argv[2:])
+        return
+    # Answer a bare version check before loading argparse
+    if sys.argv[1:] in (['-v'], ['--version']):
+        print(f'CCC {VERSION}')
+        return
+    
+    import argparse
+    
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Cline Claude Cost Calculator - Analyze your Claude Code usage with Cline')
+    parser.add_argument('-v', '--version', action='version', version=f'CCC {VERSION}')
+    parser.add_argument('--format', choices=('rich', 'plain', 'json'), default='rich', help='Report format: rich tables (default), plain text or JSON')
+    parser.add_argument('--export-svg', action='store_true', help='Export output to SVG file')
+    parser.add_argument('--export-html', action='store_true', help='Export output to HTML file')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every task folder without using the scan cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='Discard the scan cache and re-parse every task folder')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of processes used to parse task folders (default: CPU count)')
+    parser.add_argument('--path', action='append', metavar='DIR', help='Cline tasks directory to scan, can be repeated (default: every known VS Code, VS Code Server, Insiders and Cursor location found)')
+    parser.add_argument('--since', metavar='WHEN', help='Only count requests from this date or datetime on (ISO format, today, yesterday, week, month or Nd for N days ago)')
+    parser.add_argument('--until', metavar='WHEN', help='Only count requests up to this date (inclusive) or before this datetime')
+    parser.add_argument('--task', action='append', metavar='ID', help='Only count this task (its folder name), can be repeated')
+    parser.add_argument('--workspace', metavar='TEXT', help='Only count tasks whose working directory contains TEXT')
+    parser.add_argument('--pricing', metavar='FILE', help='JSON or TOML file with model rates that override or extend the built-in pricing')
+    parser.add_argument('--max-file-size', type=float, metavar='MB', help='Skip ui_messages.json files larger than this many MB')
+    parser.add_argument('--file-timeout', type=float, metavar='SECONDS', help='Give up on a ui_messages.json file that takes longer than this to read')
+    parser.add_argument('--top', type=int, metavar='N', help='Also rank the N most expensive tasks and workspaces')
+    parser.add_argument('--rank-by', choices=RANKING_KEYS, default='cost', help='What --top ranks by: calculated cost (default), tokens or API requests')
+    parser.add_argument('--plans', action='store_true', help='Compare the API cost with the Pro, Max 5x and Max 20x subscriptions month by month')
+    parser.add_argument('--what-if', action='append', metavar='SCENARIO', help=f'Add a pricing scenario to --plans: {", ".join(WHAT_IF_PRESETS)}, FROM=TO model remappings or a pricing file; can be repeated')
+    parser.add_argument('--plan-limits', metavar='5H,7D', help="Flag plans over these estimated Pro usage limits in --plans: the API-rate dollars Pro allows per 5 hours and per 7 days, scaled 5x and 20x for Max (off by default, as Anthropic doesn't publish them)")
+    parser.add_argument('--tz', default='local', metavar='ZONE', help='Time zone of the weekday/hour heatmap: local (default), UTC, an offset such as +02:00 or a name such as Europe/Paris')
+    parser.add_argument('--today-cost', action='store_true', help="Only print today's calculated API cost, e.g. for a shell prompt or status bar")
+    parser.add_argument('--watch', action='store_true', help='Keep running and show a live dashboard that updates as tasks change')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between dashboard updates in --watch mode (default: 2)')
+    parser.add_argument('--export-requests', metavar='FILE', help='Write every API request to a .csv, .jsonl or .parquet file (Parquet needs pyarrow)')
+    parser.add_argument('--emit', metavar='FILE', help='Write model totals and daily/monthly buckets as a JSON summary (.json.gz to compress) for `CCC.py merge`')
+    parser.add_argument('--timings', action='store_true', help='Show the time, bytes, files and entries of each phase of the run')
+    parser.add_argument('--profile', metavar='FILE', help='Write a cProfile dump, or the phase timings when FILE ends in .json (implies --timings)')
+    args = parser.parse_args()
+    
+    if args.pricing:
+        try:
+            use_pricing(load_pricing_file(args.pricing))
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load pricing from {args.pricing}: {e}")
+    
+    if args.today_cost:
+        if args.since or args.until:
+            parser.error("--today-cost can't be combined with --since or --until")
+        args.since = 'today'
+    
+    scan_filter = None
+    if args.since or args.until or args.task or args.workspace:
+        if args.watch:
+            parser.error("--since, --until, --task, --workspace and --today-cost can't be combined with --watch")
+        try:
+            scan_filter = ScanFilter(
+                since=parse_time_bound(args.since) if args.since else None,
+                until=parse_time_bound(args.until, end=True) if args.until else None,
+                task_ids=args.task,
+                workspace=args.workspace
+            )
+        except ValueError as e:
+            parser.error(f"invalid --since/--until value: {e}")
+    
+    if args.watch and args.format != 'rich':
+        parser.error("--watch needs --format rich")
+    if args.emit == '-' and args.format != 'json':
+        parser.error("--emit - needs --format json, whose report then includes the summary, so stdout holds one JSON document")
+    if args.top is not None and args.top < 1:
+        parser.error("--top needs a positive number of tasks")
+    scenarios = None
+    plan_limits = None
+    if args.plan_limits is not None:
+        try:
+            plan_limits = parse_plan_limits(args.plan_limits)
+        except ValueError as e:
+            parser.error(f"invalid --plan-limits value {args.plan_limits}: {e}")
+    if args.plans or args.what_if or plan_limits:
+        scenarios = [("current", dict(ccc_core.PRICING.vectors))]
+        for spec in args.what_if or ():
+            try:
+                scenarios.append(parse_what_if(spec))
+            except (OSError, ValueError) as e:
+                parser.error(f"invalid --what-if scenario {spec}: {e}")
+    try:
+        heatmap_tz = parse_timezone(args.tz)
+    except ValueError as e:
+        parser.error(f"invalid --tz value: {e}")
+    budget = None
+    if args.max_file_size is not None or args.file_timeout is not None:
+        if (args.max_file_size is not None and args.max_file_size <= 0) or (args.file_timeout is not None and args.file_timeout <= 0):
+            parser.error("--max-file-size and --file-timeout must be positive")
+        budget = ScanBudget(int(args.max_file_size * 1_048_576) if args.max_file_size is not None else None, args.file_timeout)
+    
+    if args.path:
+        base_paths = [Path(os.path.expanduser(path)) for path in args.path]
+    else:
+        base_paths = discover_task_roots() or [Path(os.path.expanduser("~/.vscode-server/data/User/globalStorage/saoudrizwan.claude-dev/tasks"))]
+    
+    if args.today_cost:
+        cache = None if args.no_cache else ScanCache(rebuild=args.rebuild_cache)
+        try:
+            print(f"${today_cost(base_paths, cache=cache, jobs=args.jobs, scan_filter=scan_filter):,.2f}")
+        finally:
+            if cache is not None:
+                cache.close()
+        return
+    
+    filters = describe_filters(scan_filter, args) if scan_filter is not None else None
+    
+    console = None
+    if args.format == 'rich':
+        from rich.console import Console
+        
+        console = Console()
+        # Header
+        render_header(console, base_paths, filters)
+    
+    def notify(message):
+        """Status line after the report; kept off stdout in JSON mode"""
+        if console is not None:
+            console.print(f"\n[green]✅ {message}[/green]")
+        else:
+            print(message, file=sys.stderr if args.format == 'json' else sys.stdout)
+    
+    if args.watch:
+        cache = None if args.no_cache else ScanCache(rebuild=args.rebuild_cache)
+        try:
+            watch_usage(console, base_paths, cache=cache, jobs=args.jobs, interval=args.interval,
+                        aggregator=UsageAggregator(tz=heatmap_tz, tz_name=args.tz))
+        finally:
+            if cache is not None:
+                cache.close()
+        return
+    
+    exporter = None
+    if args.export_requests:
+        try:
+            exporter = RequestExporter(args.export_requests)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not export requests to {args.export_requests}: {e}")
+    
+    timings = PhaseTimings() if (args.timings or args.profile) else None
+    profiler = None
+    if args.profile and not args.profile.endswith('.json'):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    aggregator = UsageAggregator(tz=heatmap_tz, tz_name=args.tz)
+    ranking = TaskRanking(args.top, args.rank_by) if args.top else None
+    
+    def scan():
+        cache = None if args.no_cache else ScanCache(rebuild=args.rebuild_cache)
+        try:
+            return calculate_token_usage(
+                base_paths, silent=True, cache=cache, jobs=args.jobs, aggregator=aggregator, timings=timings,
+                exporter=exporter, scan_filter=scan_filter, ranking=ranking, budget=budget)
+        except KeyboardInterrupt:
+            if cache is not None:
+                print("Interrupted. Task folders parsed so far are saved in the scan cache, run again to resume.", file=sys.stderr)
+            raise SystemExit(130)
+        finally:
+            if cache is not None:
+                cache.close()
+            if exporter is not None:
+                exporter.close()
+    
+    if console is not None:
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console,
+        ) as progress:
+            task = progress.add_task("Processing files...", total=None)
+            model_totals, file_count, entry_count, skipped_count, timestamps, request_data = scan()
+            progress.update(task, completed=100)
+    else:
+        model_totals, file_count, entry_count, skipped_count, timestamps, request_data = scan()
+    if timings is not None:
+        timings.lap('scan')
+    
+    plans = simulate_plans(request_data, scenarios, plan_limits) if scenarios is not None else None
+    rolling = calculate_rolling_windows(request_data, calculate_model_cost(model_totals)[0])
+    report = build_report(aggregator, file_count, skipped_count, entry_count, base_paths, filters, ranking, plans, rolling)
+    if timings is not None:
+        timings.lap('summary')
+    
+    import random
+    
+    tip = random.choice(REPORT_TIPS)
+    if args.format == 'rich':
+        render_report(console, report, tip)
+    elif args.format == 'plain':
+        print(format_plain_report(report))
+    else:
+        json_report = report_to_json(report)
+        if timings is not None:
+            json_report['timings'] = timings.to_dict()
+        if args.emit == '-':
+            json_report['summary'] = build_usage_summary(aggregator, file_count, skipped_count, entry_count)
+        print(json.dumps(json_report, indent=2))
+    if timings is not None:
+        timings.lap('rendering')
+    
+    # Handle export functionality
+    if args.export_svg or args.export_html:
+        from datetime import datetime
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        svg_path = f"CCC-{current_date}.svg" if args.export_svg else None
+        html_path = f"CCC-{current_date}.html" if args.export_html else None
+        
+        export_report(report, tip, svg_path, html_path)
+        for filename in (svg_path, html_path):
+            if filename:
+                notify(f"Report exported to {filename}")
+        if timings is not None:
+            timings.lap('export')
+    
+    if exporter is not None:
+        notify(f"{exporter.rows:,} requests exported to {args.export_requests}")
+    
+    if args.emit and args.emit != '-':
+        write_summary(build_usage_summary(aggregator, file_count, skipped_count, entry_count), args.emit)
+        notify(f"Summary written to {args.emit}")
+    
+    # Timings are shown after the report so they stay out of the exports
+    if timings is not None:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if console is not None:
+            console.print()
+            console.print(build_timings_table(timings, args.jobs))
+        elif args.format == 'plain':
+            print()
+            print(format_plain_timings(timings, args.jobs))
+        if args.profile:
+            if profiler is None:
+                with open(args.profile, 'w', encoding='utf-8') as f:
+                    json.dump(dict(timings.to_dict(), version=VERSION, jobs=args.jobs), f, indent=2)
+            notify(f"Profile written to {args.profile}")
@@ -0,0 +1,2833 @@
+"""Scanning, pricing and aggregation of CCC; ccc_cli.py is the command-line layer and CCC.py its entry point"""
+import os
+import re
+import math
+import json
+import heapq
+import time
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+# Names a star import of ccc_core provides; the modules it imports are not among them
+__all__ = [
+    'VERSION', 'MODEL_TYPES', 'MODEL_CODES', 'MODEL_NAMES', 'MODEL_PRICING', 'PRICE_FIELDS', 'PricingEngine',
+    'load_pricing_file', 'ModelRegistry', 'use_pricing', 'PRICING', 'MODEL_REGISTRY', 'JSON_STRUCTURE',
+    'JSON_STRING_END', 'API_REQ_STARTED', 'ENTRY_START', 'WORKSPACE_PATTERN', 'EntryLayoutError', 'TruncatedJSONError',
+    'ScanTimeoutError', 'SCAN_ERRORS', 'BUDGET_ERRORS', 'ScanBudget', 'PhaseTimings', 'calculate_model_cost',
+    'find_entry_start', 'is_closed_array', 'no_entry_error', 'iter_api_req_entries_fast', 'read_api_req_entries',
+    'iter_api_req_entries', 'get_task_signature', 'get_task_model_ids', 'classify_models', 'get_task_models',
+    'skipped_task_result', 'get_api_req_record', 'attribute_records', 'find_task_workspace', 'ScanFilter',
+    'parse_time_bound', 'MIXED_TIMEZONES', 'local_timezone_name', 'parse_timezone', 'parse_task_folder',
+    'parse_task_folder_timed', 'CLINE_TASKS_SUBPATH', 'EDITOR_DATA_DIRS', 'SERVER_DATA_DIRS', 'candidate_task_roots',
+    'discover_task_roots', 'as_task_roots', 'default_cache_path', 'ScanCache', 'ui_messages_size', 'list_task_folders',
+    'iter_task_results', 'RequestTable', 'QuantileSketch', 'CONTEXT_SIZE_BOUNDS', 'REQUEST_SKETCHES', 'WEEKDAYS',
+    'UsageAggregator', 'RANKING_KEYS', 'RANKING_TITLES', 'TaskRanking', 'RequestExporter', 'calculate_token_usage',
+    'LiveUsage', 'InotifyWatcher', 'PollingWatcher', 'open_tasks_watcher', 'USAGE_ENDPOINTS', 'usage_query',
+    'summarize_usage_period', 'calculate_monthly_average', 'calculate_daily_usage_stats', 'summarize_daily_groups',
+    'get_model_name', 'get_combined_totals', 'calculate_monthly_costs', 'ROLLING_WINDOWS', 'calculate_rolling_windows',
+    'summarize_monthly_groups', 'SUBSCRIPTION_PLANS', 'PLAN_LIMIT_WINDOWS', 'WHAT_IF_PRESETS', 'parse_what_if',
+    'WINDOW_STEPS', 'parse_plan_limits', 'cost_weights', 'window_sums', 'simulate_plans', 'SUMMARY_FORMAT',
+    'SUMMARY_VERSION', 'build_usage_summary', 'open_summary_file', 'write_summary', 'read_summary',
+    'iter_summary_paths', 'merge_summaries', 'build_report', 'report_to_json', 'today_cost'
+]
+
+VERSION = "1.0.4"
+
+# Model types in display order; a model's index is its code in RequestTable
+MODEL_TYPES = ('claude-sonnet-4', 'claude-opus-4', 'claude-3-7-sonnet', 'claude-3-5-sonnet', 'claude-3-5-haiku', 'other')
+MODEL_CODES = {model_type: code for code, model_type in enumerate(MODEL_TYPES)}
+
+# Display names; model types without one are shown as "Claude <Model-Type>"
+MODEL_NAMES = {
+    'claude-sonnet-4': "Claude Sonnet-4",
+    'claude-opus-4': "Claude Opus-4",
+    'claude-3-7-sonnet': "Claude 3.7 Sonnet",
+    'claude-3-5-sonnet': "Claude 3.5 Sonnet",
+    'claude-3-5-haiku': "Claude 3.5 Haiku",
+}
+
+# Model-specific pricing per 1M tokens
+MODEL_PRICING = {
+    'claude-sonnet-4': {
+        'input_per_1M': 3.00,
+        'output_per_1M': 15.00,
+        'cache_write_per_1M': 3.75,
+        'cache_read_per_1M': 0.30
+    },
+    'claude-opus-4': {
+        'input_per_1M': 15.00,
+        'output_per_1M': 75.00,
+        'cache_write_per_1M': 18.75,
+        'cache_read_per_1M': 1.50
+    },
+    'claude-3-7-sonnet': {
+        'input_per_1M': 3.00,
+        'output_per_1M': 15.00,
+        'cache_write_per_1M': 3.75,
+        'cache_read_per_1M': 0.30
+    },
+    'claude-3-5-sonnet': {
+        'input_per_1M': 3.00,
+        'output_per_1M': 15.00,
+        'cache_write_per_1M': 3.75,
+        'cache_read_per_1M': 0.30
+    },
+    'claude-3-5-haiku': {
+        'input_per_1M': 0.80,
+        'output_per_1M': 4.00,
+        'cache_write_per_1M': 1.00,
+        'cache_read_per_1M': 0.08
+    },
+    'other': {
+        'input_per_1M': 3.00,  # Default to Sonnet pricing
+        'output_per_1M': 15.00,
+        'cache_write_per_1M': 3.75,
+        'cache_read_per_1M': 0.30
+    }
+}
+
+# Rate fields of a pricing entry, in the order of a model's rate vector
+PRICE_FIELDS = ('input_per_1M', 'output_per_1M', 'cache_write_per_1M', 'cache_read_per_1M')
+
+class PricingEngine:
+    """
+    Model rates compiled once into fixed (input, output, cache write, cache read)
+    vectors of prices per 1M tokens, so pricing a batch of requests only indexes a
+    list per row instead of looking rates up by model name in the pricing table
+    """
+    def __init__(self, pricing):
+        self.pricing = pricing
+        self.vectors = {
+            model_type: tuple(float(rates[field]) for field in PRICE_FIELDS)
+            for model_type, rates in pricing.items()
+        }
+
+    @staticmethod
+    def price_rows(rows):
+        """
+        Cost of each (tokensIn, tokensOut, cacheWrites, cacheReads, rate vector) row.
+        A plain per-row loop: without numpy, computing it column by column with
+        map(operator.mul, ...) over the arrays measured slower, not faster.
+        """
+        return [
+            (tokens_in / 1_000_000) * rates[0] +
+            (tokens_out / 1_000_000) * rates[1] +
+            (cache_writes / 1_000_000) * rates[2] +
+            (cache_reads / 1_000_000) * rates[3]
+            for tokens_in, tokens_out, cache_writes, cache_reads, rates in rows
+        ]
+
+    def cost(self, model_type, tokens_in, tokens_out, cache_writes, cache_reads):
+        return self.price_rows([(tokens_in, tokens_out, cache_writes, cache_reads, self.vectors[model_type])])[0]
+
+    def component_costs(self, model_type, tokens_in, tokens_out, cache_writes, cache_reads):
+        """Input, output, cache write and cache read cost, for per-token-type breakdowns"""
+        rates = self.vectors[model_type]
+        return tuple((tokens / 1_000_000) * rate for tokens, rate in zip((tokens_in, tokens_out, cache_writes, cache_reads), rates))
+
+    def price_records(self, records):
+        """Cost of each (timestamp, tokensIn, tokensOut, cacheWrites, cacheReads, cost, model type) record"""
+        if not records:
+            return []
+        _, tokens_in, tokens_out, cache_writes, cache_reads, _, model_types = zip(*records)
+        return self.price_rows(zip(tokens_in, tokens_out, cache_writes, cache_reads, map(self.vectors.__getitem__, model_types)))
+
+    def price_columns(self, codes, tokens_in, tokens_out, cache_writes, cache_reads, reported_costs):
+        """
+        Cost of every row of columnar request data, selecting each row's rate vector
+        by model code; rows of models without rates keep their reported cost
+        """
+        missing = {code for code, model_type in enumerate(MODEL_TYPES) if model_type not in self.vectors}
+        vectors = [self.vectors.get(model_type, (0.0, 0.0, 0.0, 0.0)) for model_type in MODEL_TYPES]
+        costs = array('d', self.price_rows(zip(tokens_in, tokens_out, cache_writes, cache_reads, map(vectors.__getitem__, codes))))
+        if missing:
+            for i, code in enumerate(codes):
+                if code in missing:
+                    costs[i] = reported_costs[i]
+        return costs
+
+def load_pricing_file(path):
+    """
+    Read model rates from a JSON or TOML file, keyed by model type (a model ID
+    prefix), and merge them over the built-in MODEL_PRICING table
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML pricing files need Python 3.11 or later, use a JSON file instead")
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must map model types to their rates")
+    
+    pricing = {model_type: dict(rates) for model_type, rates in MODEL_PRICING.items()}
+    for model_type, rates in data.items():
+        if not isinstance(rates, dict):
+            raise ValueError(f"Pricing for {model_type} must be a table of rates")
+        entry = pricing.setdefault(model_type, {})
+        if 'name' in rates:
+            entry['name'] = str(rates['name'])
+        for field in PRICE_FIELDS:
+            if field in rates:
+                entry[field] = float(rates[field])
+            elif field not in entry:
+                raise ValueError(f"Pricing for {model_type} is missing {field}")
+    return pricing
+
+class ModelRegistry:
+    """
+    Known model types (model ID prefixes) and their display names. Model IDs are
+    classified by longest prefix through a character trie, memoized per model ID.
+    """
+    def __init__(self, model_types, names):
+        self.names = names
+        self.trie = {}
+        for model_type in model_types:
+            if model_type == 'other':
+                continue
+            node = self.trie
+            for char in model_type:
+                node = node.setdefault(char, {})
+            node[None] = model_type  # a model type ends at this node
+        self.classify = lru_cache(maxsize=4096)(self._classify)
+
+    def _classify(self, model_id):
+        """Model type with the longest prefix of model_id, or 'other' if none matches"""
+        best = 'other'
+        node = self.trie
+        for char in model_id:
+            node = node.get(char)
+            if node is None:
+                break
+            best = node.get(None, best)
+        return best
+
+    def name(self, model_type):
+        return self.names.get(model_type) or f"Claude {model_type.title()}"
+
+def use_pricing(pricing):
+    """
+    Make a pricing table the active one, registering any new model types (ahead
+    of 'other') and their display names so requests can be classified and coded
+    """
+    global PRICING, MODEL_TYPES, MODEL_CODES, MODEL_NAMES, MODEL_REGISTRY
+    
+    new_types = tuple(model_type for model_type in pricing if model_type not in MODEL_TYPES)
+    MODEL_TYPES = MODEL_TYPES[:-1] + new_types + ('other',)
+    MODEL_CODES = {model_type: code for code, model_type in enumerate(MODEL_TYPES)}
+    MODEL_NAMES = dict(MODEL_NAMES, **{model_type: rates['name'] for model_type, rates in pricing.items() if 'name' in rates})
+    MODEL_REGISTRY = ModelRegistry(MODEL_TYPES, MODEL_NAMES)
+    PRICING = PricingEngine(pricing)
+
+PRICING = PricingEngine(MODEL_PRICING)
+MODEL_REGISTRY = ModelRegistry(MODEL_TYPES, MODEL_NAMES)
+
+# Byte patterns used by the streaming ui_messages.json reader
+JSON_STRUCTURE = re.compile(rb'["\[\]{}]')
+JSON_STRING_END = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+API_REQ_STARTED = b'"api_req_started"'
+ENTRY_START = re.compile(rb'\{\s*"ts"\s*:')
+# Cline opens each request's environment details with the task's workspace
+WORKSPACE_PATTERN = re.compile(r'# Current Working Directory \((.*?)\) Files')
+
+class EntryLayoutError(ValueError):
+    """Raised when ui_messages.json entries don't follow Cline's {"ts": ...} layout"""
+
+class TruncatedJSONError(json.JSONDecodeError):
+    """
+    Raised when ui_messages.json ends before its array is closed, usually because
+    Cline is still writing it; `entries` holds the complete entries read before the cut
+    """
+    def __init__(self, msg="Unterminated JSON array", entries=None):
+        super().__init__(msg, "", 0)
+        self.entries = entries if entries is not None else []
+
+class ScanTimeoutError(Exception):
+    """Raised when reading a ui_messages.json file takes longer than its time budget"""
+
+# Error categories of task folders that could not be read, or only partly
+SCAN_ERRORS = {
+    'truncated': "unterminated ui_messages.json, valid prefix counted",
+    'invalid_json': "invalid JSON",
+    'invalid_metadata': "malformed task_metadata.json",
+    'invalid_entry': "malformed api_req_started entries skipped",
+    'encoding': "not UTF-8",
+    'unreadable': "unreadable file",
+    'too_large': "over --max-file-size",
+    'timeout': "over --file-timeout",
+    'other': "other error"
+}
+# Errors that depend on the run's budget rather than the file, so are never cached
+BUDGET_ERRORS = ('too_large', 'timeout')
+
+class ScanBudget:
+    """Per-file limits of a scan: the largest ui_messages.json to read and the seconds each may take"""
+    def __init__(self, max_bytes=None, seconds=None):
+        self.max_bytes = max_bytes
+        self.seconds = seconds
+
+    def deadline(self):
+        """time.monotonic() value after which reading the current file gives up, or None"""
+        return time.monotonic() + self.seconds if self.seconds else None
+
+class PhaseTimings:
+    """
+    Wall time of each phase of a run, item counters and skip reasons, collected
+    for --timings and --profile. Timings recorded in parser processes are merged
+    in, so their per-folder phases add up time across every worker.
+    """
+    def __init__(self):
+        self.phases = {}  # phase -> [seconds, calls]
+        self.counters = {}
+        self.skip_reasons = {}
+        self._lap_start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds, calls=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0.0, 0]
+        phase[0] += seconds
+        phase[1] += calls
+
+    def lap(self, name):
+        """Record the time since the previous lap (or creation) as a phase"""
+        now = time.perf_counter()
+        self.add(name, now - self._lap_start)
+        self._lap_start = now
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def skip(self, reason):
+        self.skip_reasons[reason] = self.skip_reasons.get(reason, 0) + 1
+
+    def merge(self, other):
+        for name, (seconds, calls) in other.phases.items():
+            self.add(name, seconds, calls)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for reason, amount in other.skip_reasons.items():
+            self.skip_reasons[reason] = self.skip_reasons.get(reason, 0) + amount
+
+    def to_dict(self):
+        return {
+            'phases': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+            'counters': dict(self.counters),
+            'skip_reasons': dict(self.skip_reasons)
+        }
+
+def calculate_model_cost(model_totals):
+    """
+    Calculate cost for each model type with their specific pricing
+    """
+    total_calculated_cost = 0
+    model_costs = {}
+    
+    for model_type, totals in model_totals.items():
+        if totals['count'] > 0:  # Only calculate if model was used
+            calculated_cost = PRICING.cost(
+                model_type, totals['tokensIn'], totals['tokensOut'], totals['cacheWrites'], totals['cacheReads'])
+            model_costs[model_type] = {
+                'calculated_cost': calculated_cost,
+                'rates': PRICING.pricing[model_type]
+            }
+            total_calculated_cost += calculated_cost
+    
+    return model_costs, total_calculated_cost
+
+def find_entry_start(buffer, pos):
+    """Return the offset of the last `{"ts":` entry opening before pos, or -1"""
+    while True:
+        pos = buffer.rfind(b'"ts"', 0, pos)
+        if pos < 0:
+            return -1
+        i = pos - 1
+        while i >= 0 and buffer[i] in b' \t\r\n':
+            i -= 1
+        # An unescaped quote after `{` can only open a key, never sit inside a string
+        if i >= 0 and buffer[i] == 0x7b:
+            return i
+
+def is_closed_array(buffer):
+    """
+    Whether a buffer holding the end of a ui_messages.json file closes its array
+    after a complete last entry, rather than being cut off mid-write at a `]`
+    that sits inside a string
+    """
+    tail = buffer.rstrip()
+    if not tail.endswith(b']'):
+        return False
+    last = find_entry_start(tail, len(tail))
+    if last < 0:
+        return tail[:-1].strip() in (b'[', b'')
+    try:
+        json.loads(tail[last:-1])
+    except UnicodeDecodeError:
+        # Undecodable bytes are an encoding error whether or not the array is closed
+        raise
+    except ValueError:
+        return False
+    return True
+
+def no_entry_error(buffer):
+    """
+    Error for a ui_messages.json array that ends before its first complete entry,
+    which is invalid rather than truncated: a UnicodeDecodeError when its bytes
+    aren't UTF-8 (short of a character cut off at the end), a JSONDecodeError otherwise
+    """
+    import codecs
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(buffer)
+    except UnicodeDecodeError as e:
+        return e
+    return json.JSONDecodeError("No complete entry before the end of the file", "", 0)
+
+def iter_api_req_entries_fast(json_file, chunk_size=1 << 20, offset=0, deadline=None):
+    """
+    Yield (file offset, entry) for the api_req_started entries of a ui_messages.json
+    file using a byte-level pre-filter: each "api_req_started" occurrence is located
+    with a plain substring search and only its enclosing entry, bounded by the
+    `{"ts":` openings Cline writes for every message, is handed to json.loads.
+    Everything else in the file is never decoded. A non-zero offset resumes at an
+    entry opening found by an earlier scan. Raises EntryLayoutError if an entry
+    can't be delimited this way, TruncatedJSONError if the array is not terminated
+    (after yielding every complete entry), no_entry_error's errors if it ends
+    before any complete entry and ScanTimeoutError once time.monotonic() passes
+    `deadline`.
+    """
+    with open(json_file, 'rb') as f:
+        f.seek(offset)
+        buffer = f.read(chunk_size)
+        if offset == 0 and not buffer.lstrip().startswith(b'['):
+            if not buffer.strip():
+                raise json.JSONDecodeError("Empty file", "", 0)
+            raise json.JSONDecodeError("Expected a JSON array", "", 0)
+        base = offset    # file offset of buffer[0]
+        pos = 0
+        read_size = chunk_size
+        eof = False
+        complete = offset > 0    # whether an entry has ended before the buffer's last one
+        
+        def cut_off():
+            """The error for the array ending before its `]`"""
+            last = find_entry_start(buffer, len(buffer))
+            if complete or (last >= 0 and find_entry_start(buffer, last) >= 0):
+                return TruncatedJSONError()
+            try:
+                if last >= 0 and isinstance(json.JSONDecoder().raw_decode(buffer[last:].decode('utf-8', 'ignore'))[0], dict):
+                    return TruncatedJSONError()
+            except ValueError:
+                pass
+            return no_entry_error(buffer)
+        
+        while True:
+            hit = buffer.find(API_REQ_STARTED, pos)
+            while hit >= 0:
+                start = find_entry_start(buffer, hit)
+                if start < 0:
+                    raise EntryLayoutError(f"No entry opening before offset {hit}")
+                next_entry = ENTRY_START.search(buffer, hit)
+                if next_entry is not None:
+                    end = next_entry.start()
+                elif eof:
+                    # The last entry is only complete if the array was closed after it
+                    if not is_closed_array(buffer):
+                        # Cut after the entry (e.g. only the `]` is missing, or inside the
+                        # opening of the next one) or inside it
+                        try:
+                            entry = json.JSONDecoder().raw_decode(buffer[start:].decode('utf-8', 'ignore'))[0]
+                        except ValueError:
+                            raise cut_off()
+                        if isinstance(entry, dict):
+                            yield base + start, entry
+                            complete = True
+                        raise cut_off()
+                    end = buffer.rfind(b']')
+                else:
+                    break
+                
+                try:
+                    entry = json.loads(buffer[start:end].rstrip(b' \t\r\n,'))
+                except ValueError:
+                    raise EntryLayoutError(f"Could not delimit the entry at offset {start}")
+                yield base + start, entry
+                complete = True
+                
+                pos = end
+                hit = buffer.find(API_REQ_STARTED, pos)
+            
+            if eof:
+                if not is_closed_array(buffer):
+                    raise cut_off()
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                raise ScanTimeoutError(f"Gave up reading {json_file} at offset {base + len(buffer)}")
+            
+            chunk = f.read(read_size)
+            eof = not chunk
+            
+            # Keep the entry in progress (or the last one, which may hold a split match)
+            keep = find_entry_start(buffer, hit if hit >= 0 else len(buffer))
+            if keep > 0:
+                # An entry opening before the kept one ended there
+                complete = complete or find_entry_start(buffer, keep) >= 0
+                buffer = buffer[keep:]
+                base += keep
+                pos = max(pos - keep, 0)
+            buffer += chunk
+            # Grow reads while a single entry outgrows the buffer so it isn't re-scanned repeatedly
+            read_size = max(chunk_size, len(buffer))
+
+def read_api_req_entries(json_file, chunk_size=1 << 20, deadline=None):
+    """
+    Return the decoded api_req_started entries of a ui_messages.json file, using
+    the byte-level pre-filter and falling back to the structural scanner for files
+    whose entries are not laid out the way Cline writes them. A TruncatedJSONError
+    carries the entries read before the file ended.
+    """
+    entries = []
+    try:
+        try:
+            entries.extend(entry for _, entry in iter_api_req_entries_fast(json_file, chunk_size, deadline=deadline))
+        except EntryLayoutError:
+            entries = []
+            entries.extend(iter_api_req_entries(json_file, chunk_size, deadline))
+    except TruncatedJSONError as e:
+        e.entries = entries
+        raise
+    return entries
+
+def iter_api_req_entries(json_file, chunk_size=1 << 20, deadline=None):
+    """
+    Stream the top-level entries of a ui_messages.json array and yield only those
+    that mention api_req_started, decoded. Other entries (tool output, diffs, file
+    contents) are skipped at the byte level without being materialized, so memory
+    stays bounded by the largest single entry rather than the whole file.
+    Raises TruncatedJSONError and ScanTimeoutError like iter_api_req_entries_fast.
+    """
+    with open(json_file, 'rb') as f:
+        buffer = b''
+        pos = 0          # scan position in buffer
+        depth = 0        # bracket depth, 1 means inside the top-level array
+        start = None     # buffer offset where the current top-level entry begins
+        complete = False # whether a top-level entry has ended
+        read_size = chunk_size
+        
+        while True:
+            match = JSON_STRUCTURE.search(buffer, pos)
+            if match is not None:
+                char = match.group()
+                if char == b'"':
+                    string_end = JSON_STRING_END.match(buffer, match.end())
+                    if string_end is not None:
+                        pos = string_end.end()
+                        continue
+                    # The string runs past the buffer, re-scan it once more data is read
+                    pos = match.start()
+                elif char == b'[' or char == b'{':
+                    if depth == 0 and char != b'[':
+                        raise json.JSONDecodeError("Expected a JSON array", "", 0)
+                    if depth == 1:
+                        start = match.start()
+                    depth += 1
+                    pos = match.end()
+                    continue
+                else:
+                    depth -= 1
+                    pos = match.end()
+                    if depth == 1 and start is not None:
+                        entry = buffer[start:pos]
+                        start = None
+                        complete = True
+                        if API_REQ_STARTED in entry:
+                            yield json.loads(entry)
+                    elif depth == 0:
+                        return
+                    elif depth < 0:
+                        raise json.JSONDecodeError("Unbalanced brackets", "", 0)
+                    continue
+            
+            if deadline is not None and time.monotonic() > deadline:
+                raise ScanTimeoutError(f"Gave up reading {json_file}")
+            chunk = f.read(read_size)
+            if not chunk:
+                raise TruncatedJSONError() if complete else no_entry_error(buffer)
+            
+            # Drop everything before the entry in progress
+            keep = start if start is not None else pos
+            buffer = buffer[keep:] + chunk
+            pos -= keep
+            if start is not None:
+                start = 0
+            # Grow reads while a single entry outgrows the buffer so it isn't re-scanned repeatedly
+            read_size = max(chunk_size, len(buffer))
+
+def get_task_signature(folder):
+    """
+    Return the (mtime, size) signature of a task's metadata and ui_messages files,
+    or None if either file is missing
+    """
+    try:
+        metadata_stat = os.stat(folder / "task_metadata.json")
+        messages_stat = os.stat(folder / "ui_messages.json")
+    except OSError:
+        return None
+    return (f"{metadata_stat.st_mtime_ns}:{metadata_stat.st_size}:"
+            f"{messages_stat.st_mtime_ns}:{messages_stat.st_size}")
+
+def get_task_model_ids(metadata_file):
+    """
+    Return the (timestamp, model ID) history of a task's claude-code model usage
+    from its task_metadata.json, in the order it was recorded; empty if the task
+    never used the claude-code provider. Raises ValueError when the file isn't
+    a JSON object with a model_usage list; malformed usage items are left out.
+    """
+    with open(metadata_file, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if not isinstance(metadata, dict):
+        raise ValueError("task_metadata.json is not a JSON object")
+    model_usage = metadata.get('model_usage') or []
+    if not isinstance(model_usage, list):
+        raise ValueError("model_usage is not a list")
+
+    return [
+        (usage.get('ts') if isinstance(usage.get('ts'), (int, float)) else None,
+         usage.get('model_id') if isinstance(usage.get('model_id'), str) else '')
+        for usage in model_usage
+        if isinstance(usage, dict) and usage.get('model_provider_id') == 'claude-code'
+    ]
+
+def classify_models(model_ids):
+    """(timestamp, model type) history from a (timestamp, model ID) one, with the current model types"""
+    classify = MODEL_REGISTRY.classify
+    return [(ts, classify(model_id)) for ts, model_id in model_ids]
+
+def get_task_models(metadata_file):
+    """Return the (timestamp, model type) history of a task's claude-code model usage"""
+    return classify_models(get_task_model_ids(metadata_file))
+
+def skipped_task_result(reason=None):
+    """Result of a task folder that isn't counted (missing files or not a Claude Code task)"""
+    return {'status': 'skipped', 'model_type': 'other', 'models': [], 'model_ids': [], 'records': [], 'message': reason,
+            'workspace': None, 'error': None, 'invalid_entries': 0}
+
+def get_api_req_record(entry):
+    """
+    Return the (timestamp, tokensIn, tokensOut, cacheWrites, cacheReads, cost)
+    record of an api_req_started entry, or None if it has no usable usage data
+    """
+    if isinstance(entry, dict) and entry.get('type') == 'say' and entry.get('say') == 'api_req_started':
+        try:
+            text_data = json.loads(entry['text'])
+
+            ts = entry.get('ts')
+            return (
+                int(ts) if ts is not None else None,
+                int(text_data.get('tokensIn', 0)),
+                int(text_data.get('tokensOut', 0)),
+                int(text_data.get('cacheWrites', 0)),
+                int(text_data.get('cacheReads', 0)),
+                float(text_data.get('cost', 0.0))
+            )
+
+        except json.JSONDecodeError:
+            return None
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+    return None
+
+def attribute_records(records, models):
+    """
+    Append to each (timestamp, tokensIn, tokensOut, cacheWrites, cacheReads, cost)
+    record the model type that was active when it was sent, by bisecting the task's
+    (timestamp, model type) history. Requests without a timestamp or sent before
+    the first recorded switch count toward the task's first model.
+    """
+    history = sorted(((ts if isinstance(ts, (int, float)) else 0, model_type) for ts, model_type in models),
+                     key=lambda usage: usage[0])
+    model_types = [model_type for _, model_type in history]
+    if len(set(model_types)) == 1:
+        return [record + (model_types[0],) for record in records]
+    
+    starts = [ts for ts, _ in history]
+    attributed = []
+    for record in records:
+        index = bisect_right(starts, record[0]) - 1 if record[0] is not None else 0
+        attributed.append(record + (model_types[max(index, 0)],))
+    return attributed
+
+def find_task_workspace(entries):
+    """Workspace path named in the first api_req_started entry that has one, or None"""
+    for entry in entries:
+        text = entry.get('text') if isinstance(entry, dict) else None
+        if isinstance(text, str):
+            match = WORKSPACE_PATTERN.search(text)
+            if match:
+                # The path sits inside the entry's JSON-encoded text, so its escapes are still doubled
+                try:
+                    return json.loads(f'"{match.group(1)}"')
+                except json.JSONDecodeError:
+                    return match.group(1)
+    return None
+
+class ScanFilter:
+    """
+    Time window [since, until) in epoch ms, task IDs and workspace a scan is
+    restricted to. Whole folders are ruled out before their JSON is opened, by
+    task ID, the start time in the folder name, the ui_messages.json mtime and
+    the cached time span and workspace; entries outside the window are dropped
+    before their text is decoded.
+    """
+    def __init__(self, since=None, until=None, task_ids=None, workspace=None):
+        self.since = since
+        self.until = until
+        self.task_ids = set(task_ids) if task_ids else None
+        self.workspace = workspace
+
+    def has_time_window(self):
+        return self.since is not None or self.until is not None
+
+    def accepts_ts(self, ts):
+        if not self.has_time_window():
+            return True
+        return (ts is not None and (self.since is None or ts >= self.since) and
+                (self.until is None or ts < self.until))
+
+    def accepts_workspace(self, workspace):
+        return self.workspace is None or (workspace is not None and self.workspace in workspace)
+
+    def accepts_folder(self, folder, signature, indexed=None):
+        """
+        Whether a task folder may hold matching requests, judged without reading it.
+        `indexed` is its (signature, status, first_ts, last_ts, workspace) cache entry.
+        """
+        if self.task_ids is not None and folder.name not in self.task_ids:
+            return False
+        if signature is None:
+            return True
+        # Folders are named after the task's start time, and no request is newer than the last write
+        if self.until is not None and folder.name.isdigit() and int(folder.name) >= self.until:
+            return False
+        if self.since is not None and int(signature.split(':')[2]) // 1_000_000 < self.since:
+            return False
+        if indexed is not None and indexed[0] == signature and indexed[1] == 'ok':
+            _, _, first_ts, last_ts, workspace = indexed
+            if self.has_time_window() and (first_ts is None or
+                                           (self.since is not None and last_ts < self.since) or
+                                           (self.until is not None and first_ts >= self.until)):
+                return False
+            if not self.accepts_workspace(workspace):
+                return False
+        return True
+
+    def accepts_entry(self, entry):
+        ts = entry.get('ts') if isinstance(entry, dict) else None
+        if ts is not None:
+            try:
+                ts = int(ts)
+            except (TypeError, ValueError):
+                return True  # Kept so that decoding counts it as an invalid entry
+        return self.accepts_ts(ts)
+
+    def apply(self, result):
+        """The result restricted to the filter, or None when the task has nothing in it"""
+        if result['status'] != 'ok':
+            return result
+        if not self.accepts_workspace(result.get('workspace')):
+            return None
+        if not self.has_time_window():
+            return result
+        records = [record for record in result['records'] if self.accepts_ts(record[0])]
+        if not records:
+            return None
+        return dict(result, records=records)
+
+def parse_time_bound(value, end=False):
+    """
+    Epoch ms of a --since/--until value: an ISO date or datetime, 'today',
+    'yesterday', 'week' or 'month' (start of the current week or month), or 'Nd'
+    for N days ago. Days given as an end bound include the whole day.
+    """
+    from datetime import datetime, timedelta
+    
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    keyword = value.strip().lower()
+    whole_day = True
+    if keyword == 'today':
+        moment = today
+    elif keyword == 'yesterday':
+        moment = today - timedelta(days=1)
+    elif keyword == 'week':
+        moment, whole_day = today - timedelta(days=today.weekday()), False
+    elif keyword == 'month':
+        moment, whole_day = today.replace(day=1), False
+    elif re.fullmatch(r'\d+d', keyword):
+        moment = today - timedelta(days=int(keyword[:-1]))
+    else:
+        moment = datetime.fromisoformat(value.strip())
+        whole_day = len(value.strip()) == 10
+    if end and whole_day:
+        moment += timedelta(days=1)
+    return int(moment.timestamp() * 1000)
+
+MIXED_TIMEZONES = 'mixed'  # heatmap label of grids merged from different time zones
+
+def local_timezone_name():
+    """Name of the local time zone, such as CET/CEST, to tell 'local' heatmaps of different machines apart"""
+    import time
+
+    names = [name for name in dict.fromkeys(time.tzname) if name]
+    return '/'.join(names) if names else time.strftime('%z')
+
+def parse_timezone(value):
+    """
+    tzinfo of a --tz value: 'local' (None), 'UTC', a UTC offset such as +02:00
+    or -0530, or an IANA name such as Europe/Paris (Python 3.9+)
+    """
+    from datetime import timedelta, timezone
+
+    value = value.strip()
+    if value.lower() == 'local':
+        return None
+    if value.upper() in ('UTC', 'Z'):
+        return timezone.utc
+    match = re.fullmatch(r'(?:UTC)?([+-])(\d{1,2}):?(\d{2})?', value, re.IGNORECASE)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if offset >= timedelta(hours=24):
+            raise ValueError(f"UTC offset out of range: {value}")
+        return timezone(-offset if sign == '-' else offset)
+    try:
+        from zoneinfo import ZoneInfo
+    except ImportError:
+        raise ValueError("time zone names need Python 3.9+, use a UTC offset such as +02:00")
+    try:
+        return ZoneInfo(value)
+    except (KeyError, ValueError):
+        # ZoneInfoNotFoundError is a KeyError
+        raise ValueError(f"unknown time zone: {value}")
+
+def parse_task_folder(folder, timings=None, scan_filter=None, budget=None):
+    """
+    Parse a single task folder into a result dict with its status, first model type,
+    workspace and the (timestamp, tokensIn, tokensOut, cacheWrites, cacheReads, cost,
+    model type) records of its api_req_started entries. Phase times go to `timings`
+    when given; with a ScanFilter, entries outside it are dropped before decoding,
+    so the result only suits that filter. Files that can't be read completely get
+    one of the SCAN_ERRORS categories as `error`; a truncated file still counts the
+    entries before the cut. api_req_started entries without usable usage data are
+    counted as `invalid_entries`. A ScanBudget limits the size and read time of the file.
+    """
+    json_file = folder / "ui_messages.json"
+    metadata_file = folder / "task_metadata.json"
+    if timings is None:
+        timings = PhaseTimings()
+
+    result = skipped_task_result()
+
+    def failed(error, message):
+        return dict(result, status='error', error=error, message=message)
+
+    try:
+        with timings.phase('metadata'):
+            model_ids = get_task_model_ids(metadata_file)
+    except OSError:
+        return failed('unreadable', f"Warning: Could not read {metadata_file}")
+    except UnicodeDecodeError:
+        return failed('encoding', f"Warning: {metadata_file} is not valid UTF-8")
+    except ValueError as e:
+        # Invalid JSON or an unexpected layout
+        return failed('invalid_metadata', f"Warning: Malformed {metadata_file}: {e}")
+    except Exception as e:
+        return failed('other', f"Error processing {metadata_file}: {e}")
+    if not model_ids:
+        return skipped_task_result("no claude-code model usage")
+    models = classify_models(model_ids)
+    result = dict(result, models=models, model_ids=model_ids)
+    model_type = models[0][1]
+
+    # Process the ui_messages.json file, materializing only api_req_started entries
+    error = None
+    message = None
+    try:
+        if budget is not None and budget.max_bytes is not None and os.path.getsize(json_file) > budget.max_bytes:
+            return failed('too_large', f"Warning: Skipped {json_file}, larger than {budget.max_bytes:,} bytes")
+        with timings.phase('ui_messages'):
+            try:
+                entries = read_api_req_entries(json_file, deadline=budget.deadline() if budget is not None else None)
+            except TruncatedJSONError as e:
+                # Usually caught mid-write: count what was complete before the cut
+                entries = e.entries
+                error, message = 'truncated', f"Warning: {json_file} is truncated, counted its first {len(entries):,} requests"
+        workspace = find_task_workspace(entries)
+        if scan_filter is not None:
+            entries = [entry for entry in entries if scan_filter.accepts_entry(entry)] if scan_filter.accepts_workspace(workspace) else []
+        with timings.phase('entry decode'):
+            records = [record for record in map(get_api_req_record, entries) if record is not None]
+            invalid_entries = len(entries) - len(records)
+            records = attribute_records(records, models)
+        timings.count('entries decoded', len(entries))
+    except ScanTimeoutError:
+        return failed('timeout', f"Warning: Gave up reading {json_file} after {budget.seconds:g}s")
+    except OSError:
+        return failed('unreadable', f"Warning: Could not read {json_file}")
+    except json.JSONDecodeError:
+        return failed('invalid_json', f"Warning: Invalid JSON in {json_file}")
+    except UnicodeDecodeError:
+        return failed('encoding', f"Warning: {json_file} is not valid UTF-8")
+    except Exception as e:
+        return failed('other', f"Error processing {json_file}: {e}")
+
+    if invalid_entries and message is None:
+        message = f"Warning: Skipped {invalid_entries:,} malformed api_req_started entries in {json_file}"
+    return dict(result, status='ok', model_type=model_type, records=records, workspace=workspace, error=error,
+                message=message, invalid_entries=invalid_entries)
+
+def parse_task_folder_timed(folder, scan_filter=None, budget=None):
+    """parse_task_folder returning its PhaseTimings along with the result, for --timings"""
+    timings = PhaseTimings()
+    return parse_task_folder(folder, timings, scan_filter, budget), timings
+
+CLINE_TASKS_SUBPATH = Path("User") / "globalStorage" / "saoudrizwan.claude-dev" / "tasks"
+EDITOR_DATA_DIRS = ("Code", "Code - Insiders", "Cursor")
+SERVER_DATA_DIRS = (".vscode-server", ".vscode-server-insiders", ".cursor-server")
+
+def candidate_task_roots():
+    """
+    Cline tasks directories of VS Code, VS Code Insiders and Cursor on Linux, macOS
+    and Windows, and of their remote servers, with the VS Code Server one first
+    """
+    home = Path(os.path.expanduser("~"))
+    user_data_dirs = [
+        Path(os.environ.get('XDG_CONFIG_HOME') or home / ".config"),
+        home / "Library" / "Application Support"
+    ]
+    if os.environ.get('APPDATA'):
+        user_data_dirs.append(Path(os.environ['APPDATA']))
+    
+    roots = [home / server_dir / "data" / CLINE_TASKS_SUBPATH for server_dir in SERVER_DATA_DIRS]
+    for user_data_dir in user_data_dirs:
+        roots.extend(user_data_dir / editor_dir / CLINE_TASKS_SUBPATH for editor_dir in EDITOR_DATA_DIRS)
+    return roots
+
+def discover_task_roots():
+    """Every existing Cline tasks directory among the known locations"""
+    roots = []
+    seen = set()
+    for root in candidate_task_roots():
+        if root.is_dir() and root.resolve() not in seen:
+            seen.add(root.resolve())
+            roots.append(root)
+    return roots
+
+def as_task_roots(base_paths):
+    """A list of tasks directory Paths from a single path or an iterable of them"""
+    if isinstance(base_paths, (str, os.PathLike)):
+        return [Path(base_paths)]
+    return [Path(base_path) for base_path in base_paths]
+
+def default_cache_path():
+    """Location of the scan cache, following XDG_CACHE_HOME when it is set"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return Path(cache_home) / "ccc" / "scan-cache.sqlite3"
+
+class ScanCache:
+    """
+    Persistent SQLite cache of parsed task folders, keyed by folder path and the
+    mtime/size signature of its task_metadata.json and ui_messages.json files.
+    Model IDs are stored as recorded and classified when loaded, so the cache
+    holds for any set of model types, e.g. one extended with --pricing
+    """
+    VERSION = 9
+    # Seconds between commits while storing results, so an interrupted scan resumes from there
+    CHECKPOINT_INTERVAL = 5.0
+
+    def __init__(self, path=None, rebuild=False):
+        import sqlite3
+
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        version = str(self.VERSION)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if rebuild or row is None or row[0] != version:
+            self.conn.execute("DROP TABLE IF EXISTS tasks")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS tasks (
+            folder TEXT PRIMARY KEY,
+            signature TEXT NOT NULL,
+            status TEXT NOT NULL,
+            model_ids TEXT NOT NULL,
+            message TEXT,
+            records TEXT NOT NULL,
+            first_ts INTEGER,
+            last_ts INTEGER,
+            workspace TEXT,
+            error TEXT,
+            invalid_entries INTEGER NOT NULL
+        )""")
+        self.conn.commit()
+        self._last_commit = time.monotonic()
+
+    def signatures(self):
+        """Return the stored signature of every cached folder"""
+        return dict(self.conn.execute("SELECT folder, signature FROM tasks"))
+
+    def task_index(self):
+        """Return (signature, status, first_ts, last_ts, workspace) of every cached folder, for ScanFilter"""
+        return {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT folder, signature, status, first_ts, last_ts, workspace FROM tasks")}
+
+    def get(self, folder, signature):
+        """Return the cached result for a folder, or None if missing or stale"""
+        row = self.conn.execute(
+            "SELECT signature, status, model_ids, message, records, workspace, error, invalid_entries FROM tasks WHERE folder = ?",
+            (str(folder),)
+        ).fetchone()
+        if row is None or row[0] != signature:
+            return None
+        model_ids = [tuple(model_id) for model_id in json.loads(row[2])]
+        models = classify_models(model_ids)
+        records = [tuple(record) for record in json.loads(row[4])]
+        return {
+            'status': row[1],
+            'model_type': models[0][1] if row[1] == 'ok' else 'other',
+            'models': models,
+            'model_ids': model_ids,
+            'message': row[3],
+            'records': attribute_records(records, models) if records else [],
+            'workspace': row[5],
+            'error': row[6],
+            'invalid_entries': row[7]
+        }
+
+    def put(self, folder, signature, result):
+        """
+        Store a folder's result, with its records' model types left out, committing
+        every CHECKPOINT_INTERVAL seconds
+        """
+        timestamps = [record[0] for record in result['records'] if record[0] is not None]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (folder, signature, status, model_ids, message, records, first_ts, last_ts, workspace, "
+            "error, invalid_entries) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(folder), signature, result['status'],
+             json.dumps(result['model_ids'], separators=(',', ':')), result['message'],
+             json.dumps([record[:6] for record in result['records']], separators=(',', ':')),
+             min(timestamps) if timestamps else None, max(timestamps) if timestamps else None,
+             result['workspace'], result['error'], result['invalid_entries'])
+        )
+        if time.monotonic() - self._last_commit > self.CHECKPOINT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.conn.close()
+
+def ui_messages_size(signature):
+    """Size of ui_messages.json recorded in a task signature, -1 without one"""
+    return int(signature.split(':')[3]) if signature is not None else -1
+
+def list_task_folders(base_paths):
+    """
+    Return (folder, signature) for every task folder under the given roots, in
+    directory order, listing several roots concurrently. A task ID found under
+    more than one root is kept once, as the copy with the largest ui_messages.json
+    (the most complete history), in the position of its first occurrence.
+    """
+    def list_root(base_path):
+        try:
+            return [(folder, get_task_signature(folder)) for folder in base_path.iterdir() if folder.is_dir()]
+        except OSError:
+            return []
+    
+    if len(base_paths) == 1:
+        return list_root(base_paths[0])
+    
+    # Listing is stat-bound, so threads overlap the roots' filesystem round trips
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(base_paths)) as executor:
+        listings = list(executor.map(list_root, base_paths))
+    
+    tasks = {}
+    for listing in listings:
+        for folder, signature in listing:
+            current = tasks.get(folder.name)
+            if current is None or ui_messages_size(signature) > ui_messages_size(current[1]):
+                tasks[folder.name] = (folder, signature)
+    return list(tasks.values())
+
+def iter_task_results(base_paths, cache=None, jobs=1, timings=None, scan_filter=None, budget=None):
+    """
+    Yield (folder, signature, result) for every task folder under one or several tasks
+    directories, in directory order, with task IDs present in several of them
+    counted once. Folders missing from the cache are parsed across a pool of
+    `jobs` processes. Listing, cache and parsing times and counters go to
+    `timings` when given. With a ScanFilter, folders outside it are skipped
+    before being read and results are restricted to it; without a cache, the
+    filter is also applied while parsing, since nothing partial gets stored.
+    A ScanBudget limits each file read; files over it are not cached. The
+    signature is the one taken when listing, before the files were read.
+    """
+    profiling = timings is not None
+    if not profiling:
+        timings = PhaseTimings()
+    
+    with timings.phase('cache'):
+        cached_signatures = cache.signatures() if cache is not None else {}
+        task_index = cache.task_index() if cache is not None and scan_filter is not None else {}
+    folders = []
+    pending = []
+    
+    with timings.phase('listing'):
+        for folder, signature in list_task_folders(as_task_roots(base_paths)):
+            if scan_filter is not None and not scan_filter.accepts_folder(folder, signature, task_index.get(str(folder))):
+                timings.count('folders filtered out')
+                continue
+            # Reuse the cached parse when neither file changed since the last run
+            needs_parse = signature is not None and cached_signatures.get(str(folder)) != signature
+            folders.append((folder, signature, needs_parse))
+            if needs_parse:
+                pending.append(folder)
+                sizes = signature.split(':')
+                timings.count('bytes parsed', int(sizes[1]) + int(sizes[3]))
+    timings.count('task folders', len(folders))
+    timings.count('folders parsed', len(pending))
+    
+    parse = parse_task_folder_timed if profiling else parse_task_folder
+    if (scan_filter is not None and cache is None) or budget is not None:
+        from functools import partial
+        parse = partial(parse, scan_filter=scan_filter if cache is None else None, budget=budget)
+    if jobs > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(pending)),
+                                       initializer=use_pricing, initargs=(PRICING.pricing,))
+        chunksize = max(1, len(pending) // (jobs * 4))
+        parsed = executor.map(parse, pending, chunksize=chunksize)
+    else:
+        executor = None
+        parsed = map(parse, pending)
+    
+    try:
+        for folder, signature, needs_parse in folders:
+            if signature is None:
+                result = skipped_task_result("missing task_metadata.json or ui_messages.json")
+            elif needs_parse:
+                # Results come back in submission order, which is directory order
+                with timings.phase('parsing'):
+                    result = next(parsed)
+                if profiling:
+                    result, task_timings = result
+                    timings.merge(task_timings)
+                if cache is not None and result['error'] not in BUDGET_ERRORS:
+                    with timings.phase('cache'):
+                        cache.put(folder, signature, result)
+            else:
+                timings.count('folders from cache')
+                with timings.phase('cache'):
+                    result = cache.get(folder, signature)
+            
+            if scan_filter is not None:
+                result = scan_filter.apply(result)
+                if result is None:
+                    timings.count('folders filtered out')
+                    continue
+            yield folder, signature, result
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+class RequestTable:
+    """
+    Columnar store of api_req_started records: one compact array per field instead
+    of a dict per request, aggregated column-wise by day or month
+    """
+    def __init__(self):
+        self.timestamp = array('q')
+        self.tokens_in = array('q')
+        self.tokens_out = array('q')
+        self.cache_writes = array('q')
+        self.cache_reads = array('q')
+        self.cost = array('d')
+        self.model = array('B')
+
+    def append(self, timestamp, tokens_in, tokens_out, cache_writes, cache_reads, cost, model_type):
+        self.timestamp.append(timestamp)
+        self.tokens_in.append(tokens_in)
+        self.tokens_out.append(tokens_out)
+        self.cache_writes.append(cache_writes)
+        self.cache_reads.append(cache_reads)
+        self.cost.append(cost)
+        self.model.append(MODEL_CODES[model_type])
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __iter__(self):
+        """Yield each request as a dict, for callers that want row access"""
+        for row in zip(self.timestamp, self.tokens_in, self.tokens_out, self.cache_writes,
+                       self.cache_reads, self.cost, self.model):
+            yield {
+                'timestamp': row[0],
+                'tokensIn': row[1],
+                'tokensOut': row[2],
+                'cacheWrites': row[3],
+                'cacheReads': row[4],
+                'cost': row[5],
+                'model_type': MODEL_TYPES[row[6]]
+            }
+
+    def priced_costs(self, model_costs):
+        """
+        Recompute every request's cost with its model's rates in a single pass,
+        falling back to the reported cost for models without rates
+        """
+        pricing = PricingEngine({model_type: model_cost['rates'] for model_type, model_cost in model_costs.items()})
+        return pricing.price_columns(self.model, self.tokens_in, self.tokens_out, self.cache_writes, self.cache_reads, self.cost)
+
+    def day_keys(self):
+        """
+        Local calendar date of every request. Conversions are memoized per 15-minute
+        bucket, since UTC offsets and DST switches always fall on a quarter hour,
+        so a datetime is only built once per bucket instead of once per request.
+        """
+        from datetime import datetime
+        
+        dates = {}
+        keys = []
+        for ts in self.timestamp:
+            bucket = ts // 900_000
+            date = dates.get(bucket)
+            if date is None:
+                date = dates[bucket] = datetime.fromtimestamp(bucket * 900).date()
+            keys.append(date)
+        return keys
+
+    def month_keys(self):
+        """Local calendar month ('YYYY-MM') of every request"""
+        months = {}
+        keys = []
+        for date in self.day_keys():
+            month = months.get(date)
+            if month is None:
+                month = months[date] = date.strftime('%Y-%m')
+            keys.append(month)
+        return keys
+
+    def group_by(self, keys, costs):
+        """
+        Sum [requests, tokensIn, tokensOut, cacheWrites, cacheReads, cost] per key,
+        in order of first appearance
+        """
+        groups = {}
+        for key, tokens_in, tokens_out, cache_writes, cache_reads, cost in zip(
+                keys, self.tokens_in, self.tokens_out, self.cache_writes, self.cache_reads, costs):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, 0, 0, 0, 0, 0.0]
+            group[0] += 1
+            group[1] += tokens_in
+            group[2] += tokens_out
+            group[3] += cache_writes
+            group[4] += cache_reads
+            group[5] += cost
+        return groups
+
+class QuantileSketch:
+    """
+    DDSketch-style streaming quantiles: positive values are counted in logarithmic
+    buckets whose width is a fixed fraction of their value, so every quantile is
+    returned within RELATIVE_ACCURACY of the true one, sketches merge exactly and
+    memory stays under MAX_BUCKETS whatever the number of values
+    """
+    RELATIVE_ACCURACY = 0.01
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    MAX_BUCKETS = 2048
+
+    def __init__(self):
+        self.buckets = {}  # ceil(log_gamma(value)) -> count
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        """Add every value of an iterable of non-negative numbers"""
+        buckets = self.buckets
+        log = math.log
+        ceil = math.ceil
+        log_gamma = math.log(self.GAMMA)
+        low, high = self.min, self.max
+        for value in values:
+            if low is None:
+                low = high = value
+            elif value < low:
+                low = value
+            elif value > high:
+                high = value
+            self.count += 1
+            self.sum += value
+            if value <= 0:
+                self.zero_count += 1
+                continue
+            key = ceil(log(value) / log_gamma)
+            buckets[key] = buckets.get(key, 0) + 1
+        self.min, self.max = low, high
+        self._collapse()
+
+    def add(self, value):
+        self.update((value,))
+
+    def remove(self, values):
+        """
+        Take back values added earlier. A removed min or max falls back to the
+        nearest remaining bucket, which is within RELATIVE_ACCURACY of the true one
+        """
+        buckets = self.buckets
+        log_gamma = math.log(self.GAMMA)
+        key_of = lambda value: math.ceil(math.log(value) / log_gamma)
+        middle = lambda key: 2 * self.GAMMA ** key / (self.GAMMA + 1)
+        for value in values:
+            self.count -= 1
+            self.sum -= value
+            if value <= 0:
+                self.zero_count -= 1
+                continue
+            key = key_of(value)
+            if key not in buckets:
+                # Folded into the lowest bucket by _collapse
+                key = min(buckets)
+            buckets[key] -= 1
+            if not buckets[key]:
+                del buckets[key]
+        if not self.count:
+            self.min = self.max = None
+            self.sum = 0.0
+            return
+        if not buckets:
+            self.max = 0
+        elif self.max <= 0 or key_of(self.max) > max(buckets):
+            self.max = middle(max(buckets))
+        if not self.zero_count and (self.min <= 0 or key_of(self.min) < min(buckets)):
+            self.min = middle(min(buckets))
+
+    def _collapse(self):
+        # Fold the lowest buckets together, keeping the upper quantiles exact to RELATIVE_ACCURACY
+        if len(self.buckets) > self.MAX_BUCKETS:
+            keys = sorted(self.buckets)
+            excess = len(keys) - self.MAX_BUCKETS
+            target = keys[excess]
+            for key in keys[:excess]:
+                self.buckets[target] += self.buckets.pop(key)
+
+    def merge(self, other):
+        """Add the values counted by another sketch"""
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            if self.min is None or other.min < self.min:
+                self.min = other.min
+            if self.max is None or other.max > self.max:
+                self.max = other.max
+        self._collapse()
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank >= self.count - 1:
+            return self.max
+        if rank < self.zero_count:
+            return max(self.min, 0)
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.GAMMA ** key / (self.GAMMA + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def stats(self):
+        """Count, mean, p50, p90, p99 and max"""
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'max': self.max
+        }
+
+    def to_dict(self):
+        return {'buckets': {str(key): count for key, count in sorted(self.buckets.items())}, 'zero_count': self.zero_count,
+                'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.buckets = {int(key): count for key, count in data['buckets'].items()}
+        for key in ('zero_count', 'count', 'sum', 'min', 'max'):
+            setattr(sketch, key, data[key])
+        return sketch
+
+# Bin edges of the context size (tokensIn + cacheReads) histogram; the last bin is open-ended
+CONTEXT_SIZE_BOUNDS = (8_000, 16_000, 32_000, 64_000, 100_000, 150_000, 200_000)
+REQUEST_SKETCHES = ('request_tokens', 'request_cost', 'request_context', 'task_tokens', 'task_cost')
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+class UsageAggregator:
+    """
+    Single-pass aggregation of request records: per-model totals, per-day and
+    per-month buckets priced with model-specific rates, and the first/last
+    request timestamps, without keeping or sorting a list of timestamps
+    """
+    def __init__(self, pricing=None, tz=None, tz_name="local"):
+        self.pricing = pricing or PRICING
+        self.tz = tz  # tzinfo of the weekday/hour heatmap, None for the local time zone
+        self.tz_name = tz_name
+        self.model_totals = {
+            model_type: {
+                'tokensIn': 0, 'tokensOut': 0, 'cacheWrites': 0, 'cacheReads': 0,
+                'cost': 0.0, 'count': 0
+            }
+            for model_type in MODEL_TYPES
+        }
+        # date / 'YYYY-MM' -> [requests, tokensIn, tokensOut, cacheWrites, cacheReads, calculated cost]
+        self.days = {}
+        self.months = {}
+        self.first_ts = None
+        self.last_ts = None
+        self._periods = {}  # 15-minute bucket -> (date, month, heatmap cell)
+        # weekday * 24 + hour -> [requests, tokens, calculated cost]
+        self.heatmap = [[0, 0, 0.0] for _ in range(7 * 24)]
+        # Per request and per task distributions, in fixed memory
+        self.sketches = {name: QuantileSketch() for name in REQUEST_SKETCHES}
+        self.context_histogram = [0] * (len(CONTEXT_SIZE_BOUNDS) + 1)
+        self.errors = {}  # SCAN_ERRORS category -> task files
+
+    def count_error(self, category, count=1):
+        """Count a task file that could not be read completely (a negative count takes it back)"""
+        count += self.errors.get(category, 0)
+        if count:
+            self.errors[category] = count
+        else:
+            self.errors.pop(category, None)
+
+    def count_result_errors(self, result, count=1):
+        """Count a task result's error category and its malformed entries, if any (-1 takes them back)"""
+        if result['error'] is not None:
+            self.count_error(result['error'], count)
+        if result['invalid_entries']:
+            self.count_error('invalid_entry', count)
+
+    def add_records(self, records, task_total=True):
+        """
+        Add the (timestamp, tokensIn, tokensOut, cacheWrites, cacheReads, cost, model type)
+        records of one task, returning the cost of each calculated with its model's rates.
+        Without task_total the records are only part of a task, whose totals the caller
+        sets with replace_task_total.
+        """
+        from datetime import datetime, timedelta, timezone
+        
+        model_totals = self.model_totals
+        periods = self._periods
+        heatmap = self.heatmap
+        calculated_costs = self.pricing.price_records(records)
+        
+        for (ts, tokens_in, tokens_out, cache_writes, cache_reads, cost, model_type), calculated_cost in zip(
+                records, calculated_costs):
+            totals = model_totals[model_type]
+            totals['tokensIn'] += tokens_in
+            totals['tokensOut'] += tokens_out
+            totals['cacheWrites'] += cache_writes
+            totals['cacheReads'] += cache_reads
+            totals['cost'] += cost
+            totals['count'] += 1
+            
+            if ts is None:
+                continue
+            
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+            
+            # Local day and heatmap hour memoized per 15-minute bucket, as in RequestTable.day_keys
+            bucket = ts // 900_000
+            period = periods.get(bucket)
+            if period is None:
+                date = datetime.fromtimestamp(bucket * 900).date()
+                offset = datetime.fromtimestamp(bucket * 900, timezone.utc).astimezone(self.tz).utcoffset()
+                local_ms = bucket * 900_000 + offset // timedelta(milliseconds=1)
+                # Epoch day 0 was a Thursday (weekday 3)
+                cell = (local_ms // 86_400_000 + 3) % 7 * 24 + local_ms // 3_600_000 % 24
+                period = periods[bucket] = (date, date.strftime('%Y-%m'), cell)
+            
+            cell = heatmap[period[2]]
+            cell[0] += 1
+            cell[1] += tokens_in + tokens_out
+            cell[2] += calculated_cost
+            
+            for buckets, key in ((self.days, period[0]), (self.months, period[1])):
+                group = buckets.get(key)
+                if group is None:
+                    group = buckets[key] = [0, 0, 0, 0, 0, 0.0]
+                group[0] += 1
+                group[1] += tokens_in
+                group[2] += tokens_out
+                group[3] += cache_writes
+                group[4] += cache_reads
+                group[5] += calculated_cost
+        
+        if records:
+            sketches = self.sketches
+            tokens = [record[1] + record[2] for record in records]
+            context_sizes = [record[1] + record[4] for record in records]
+            sketches['request_tokens'].update(tokens)
+            sketches['request_cost'].update(calculated_costs)
+            sketches['request_context'].update(context_sizes)
+            if task_total:
+                sketches['task_tokens'].add(sum(tokens))
+                sketches['task_cost'].add(sum(calculated_costs))
+            histogram = self.context_histogram
+            for context_size in context_sizes:
+                histogram[bisect_right(CONTEXT_SIZE_BOUNDS, context_size)] += 1
+        
+        return calculated_costs
+
+    def remove_records(self, records):
+        """
+        Take back records added with add_records(records, task_total=False), for live
+        views whose tasks get rewritten; returns their calculated costs. The first/last
+        timestamps are not narrowed, the caller resets them.
+        """
+        model_totals = self.model_totals
+        periods = self._periods
+        calculated_costs = self.pricing.price_records(records)
+        
+        for (ts, tokens_in, tokens_out, cache_writes, cache_reads, cost, model_type), calculated_cost in zip(
+                records, calculated_costs):
+            totals = model_totals[model_type]
+            totals['tokensIn'] -= tokens_in
+            totals['tokensOut'] -= tokens_out
+            totals['cacheWrites'] -= cache_writes
+            totals['cacheReads'] -= cache_reads
+            totals['cost'] -= cost
+            totals['count'] -= 1
+            
+            if ts is None:
+                continue
+            
+            # Every added request's bucket is already known
+            period = periods[ts // 900_000]
+            cell = self.heatmap[period[2]]
+            cell[0] -= 1
+            cell[1] -= tokens_in + tokens_out
+            cell[2] -= calculated_cost
+            
+            for buckets, key in ((self.days, period[0]), (self.months, period[1])):
+                group = buckets[key]
+                group[0] -= 1
+                group[1] -= tokens_in
+                group[2] -= tokens_out
+                group[3] -= cache_writes
+                group[4] -= cache_reads
+                group[5] -= calculated_cost
+                if not group[0]:
+                    del buckets[key]
+        
+        if records:
+            sketches = self.sketches
+            context_sizes = [record[1] + record[4] for record in records]
+            sketches['request_tokens'].remove(record[1] + record[2] for record in records)
+            sketches['request_cost'].remove(calculated_costs)
+            sketches['request_context'].remove(context_sizes)
+            for context_size in context_sizes:
+                self.context_histogram[bisect_right(CONTEXT_SIZE_BOUNDS, context_size)] -= 1
+        
+        return calculated_costs
+
+    def replace_task_total(self, old, new):
+        """Swap one task's (tokens, calculated cost) in the per-task sketches; None for no task"""
+        for i, name in enumerate(('task_tokens', 'task_cost')):
+            if old is not None:
+                self.sketches[name].remove((old[i],))
+            if new is not None:
+                self.sketches[name].add(new[i])
+
+    def merge(self, other):
+        """Add the totals and buckets of another aggregator into this one"""
+        for model_type, totals in other.model_totals.items():
+            target = self.model_totals.get(model_type)
+            if target is None:
+                # Model types only known to the other side, e.g. from its --pricing file
+                self.model_totals[model_type] = dict(totals)
+                continue
+            for key, value in totals.items():
+                target[key] += value
+        
+        for buckets, other_buckets in ((self.days, other.days), (self.months, other.months)):
+            for key, group in other_buckets.items():
+                target = buckets.get(key)
+                if target is None:
+                    buckets[key] = list(group)
+                else:
+                    for i, value in enumerate(group):
+                        target[i] += value
+        
+        if other.first_ts is not None:
+            if self.first_ts is None or other.first_ts < self.first_ts:
+                self.first_ts = other.first_ts
+            if self.last_ts is None or other.last_ts > self.last_ts:
+                self.last_ts = other.last_ts
+        
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+        for i, count in enumerate(other.context_histogram):
+            self.context_histogram[i] += count
+        for category, count in other.errors.items():
+            self.errors[category] = self.errors.get(category, 0) + count
+        # Grids of different time zones don't line up: they are still added, under a 'mixed' label
+        if any(cell[0] for cell in other.heatmap):
+            if not any(cell[0] for cell in self.heatmap):
+                self.tz_name = other.tz_name
+            elif other.tz_name != self.tz_name:
+                self.tz_name = MIXED_TIMEZONES
+        for cell, other_cell in zip(self.heatmap, other.heatmap):
+            for i, value in enumerate(other_cell):
+                cell[i] += value
+
+    def to_dict(self):
+        """JSON-ready model totals, day and month buckets and first/last timestamps"""
+        return {
+            'model_totals': {model_type: dict(totals) for model_type, totals in self.model_totals.items() if totals['count']},
+            'days': {date.isoformat(): list(group) for date, group in sorted(self.days.items())},
+            'months': {month: list(group) for month, group in sorted(self.months.items())},
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+            'sketches': {name: sketch.to_dict() for name, sketch in self.sketches.items()},
+            'context_histogram': list(self.context_histogram),
+            'errors': dict(sorted(self.errors.items())),
+            'heatmap': {'timezone': self.tz_name, 'cells': [list(cell) for cell in self.heatmap]}
+        }
+
+    @classmethod
+    def from_dict(cls, data, pricing=None):
+        """Rebuild an aggregator from to_dict() output"""
+        from datetime import date
+        
+        aggregator = cls(pricing)
+        for model_type, totals in data['model_totals'].items():
+            aggregator.model_totals[model_type] = dict(totals)
+        aggregator.days = {date.fromisoformat(day): list(group) for day, group in data['days'].items()}
+        aggregator.months = {month: list(group) for month, group in data['months'].items()}
+        aggregator.first_ts = data['first_ts']
+        aggregator.last_ts = data['last_ts']
+        # Summaries written before distributions were tracked have none
+        for name, sketch in data.get('sketches', {}).items():
+            aggregator.sketches[name] = QuantileSketch.from_dict(sketch)
+        if 'context_histogram' in data:
+            aggregator.context_histogram = list(data['context_histogram'])
+        aggregator.errors = dict(data.get('errors', {}))
+        if 'heatmap' in data:
+            aggregator.tz_name = data['heatmap']['timezone']
+            aggregator.heatmap = [list(cell) for cell in data['heatmap']['cells']]
+        return aggregator
+
+    def daily_stats(self):
+        return summarize_daily_groups(self.days)
+
+    def monthly_costs(self):
+        return summarize_monthly_groups(self.months)
+
+    def monthly_average(self, calculated_cost):
+        return summarize_usage_period(calculated_cost, self.first_ts, self.last_ts)
+
+    def distribution_stats(self):
+        """
+        p50/p90/p99 of tokens, cost and context size per request, of tokens and
+        cost per day and per task, and the context size histogram
+        """
+        daily_tokens = QuantileSketch()
+        daily_tokens.update(group[1] + group[2] for group in self.days.values())
+        daily_cost = QuantileSketch()
+        daily_cost.update(group[5] for group in self.days.values())
+        
+        bounds = (0,) + CONTEXT_SIZE_BOUNDS + (None,)
+        return {
+            'per_request': {
+                'tokens': self.sketches['request_tokens'].stats(),
+                'cost': self.sketches['request_cost'].stats(),
+                'context_size': self.sketches['request_context'].stats()
+            },
+            'per_day': {'tokens': daily_tokens.stats(), 'cost': daily_cost.stats()},
+            'per_task': {'tokens': self.sketches['task_tokens'].stats(), 'cost': self.sketches['task_cost'].stats()},
+            'context_histogram': [{'min': bounds[i], 'max': bounds[i + 1], 'requests': count}
+                                  for i, count in enumerate(self.context_histogram)]
+        }
+
+    def heatmap_stats(self):
+        """Requests, tokens and calculated cost by weekday (Monday first) and hour, and the busiest hour"""
+        rows = [self.heatmap[day * 24:day * 24 + 24] for day in range(7)]
+        busiest = max(range(7 * 24), key=lambda i: (self.heatmap[i][2], self.heatmap[i][0]))
+        return {
+            'timezone': self.tz_name,
+            'weekdays': list(WEEKDAYS),
+            'requests': [[cell[0] for cell in row] for row in rows],
+            'tokens': [[cell[1] for cell in row] for row in rows],
+            'cost': [[cell[2] for cell in row] for row in rows],
+            'busiest': {
+                'weekday': WEEKDAYS[busiest // 24],
+                'hour': busiest % 24,
+                'requests': self.heatmap[busiest][0],
+                'tokens': self.heatmap[busiest][1],
+                'cost': self.heatmap[busiest][2]
+            } if self.heatmap[busiest][0] else None
+        }
+
+RANKING_KEYS = ('cost', 'tokens', 'requests')
+RANKING_TITLES = {'cost': "Cost", 'tokens': "Tokens", 'requests': "API Calls"}
+
+class TaskRanking:
+    """
+    The `size` tasks with the highest calculated cost, tokens or request count,
+    kept in a bounded min-heap while scanning so tasks are never all sorted,
+    plus per-workspace totals
+    """
+    def __init__(self, size, key='cost'):
+        if key not in RANKING_KEYS:
+            raise ValueError(f"can't rank tasks by {key!r}")
+        self.size = size
+        self.key = key
+        self.heap = []  # (ranked value, insertion order, task)
+        self.workspaces = {}  # workspace -> task
+        self._added = 0
+
+    def add(self, task_id, workspace, records, calculated_costs):
+        """Rank one task from its records and their calculated costs"""
+        if not records:
+            return
+        timestamps = [record[0] for record in records if record[0] is not None]
+        task = {
+            'task_id': task_id,
+            'workspace': workspace,
+            'requests': len(records),
+            'tokens': sum(record[1] + record[2] for record in records),
+            'cost': sum(calculated_costs),
+            'first_ts': min(timestamps) if timestamps else None,
+            'last_ts': max(timestamps) if timestamps else None
+        }
+        
+        self._added += 1
+        entry = (task[self.key], self._added, task)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, entry)
+        elif entry[0] > self.heap[0][0]:
+            heapq.heapreplace(self.heap, entry)
+        
+        totals = self.workspaces.get(workspace)
+        if totals is None:
+            totals = self.workspaces[workspace] = {'workspace': workspace, 'tasks': 0, 'requests': 0, 'tokens': 0, 'cost': 0.0}
+        totals['tasks'] += 1
+        for key in RANKING_KEYS:
+            totals[key] += task[key]
+
+    def top_tasks(self):
+        """The ranked tasks, highest first"""
+        return [task for _, _, task in sorted(self.heap, key=lambda entry: (-entry[0], entry[1]))]
+
+    def top_workspaces(self):
+        """The `size` workspaces with the highest totals, highest first"""
+        return heapq.nlargest(self.size, self.workspaces.values(), key=lambda totals: totals[self.key])
+
+class RequestExporter:
+    """
+    Streams request records to a CSV, JSON Lines or Parquet file (by extension)
+    task by task as they are scanned, so the export never holds the whole history.
+    Parquet needs pyarrow and is written in row groups of PARQUET_BATCH_SIZE rows.
+    """
+    COLUMNS = ('timestamp', 'task_id', 'model', 'tokens_in', 'tokens_out', 'cache_writes', 'cache_reads',
+               'reported_cost', 'calculated_cost')
+    FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+    PARQUET_BATCH_SIZE = 65536
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = self.FORMATS.get(self.path.suffix.lower())
+        if self.format is None:
+            raise ValueError(f"unsupported format '{self.path.suffix}', use .csv, .jsonl or .parquet")
+        self.rows = 0
+        
+        if self.format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+            self._pyarrow = pyarrow
+            self._schema = pyarrow.schema([
+                ('timestamp', pyarrow.int64()), ('task_id', pyarrow.string()), ('model', pyarrow.string()),
+                ('tokens_in', pyarrow.int64()), ('tokens_out', pyarrow.int64()),
+                ('cache_writes', pyarrow.int64()), ('cache_reads', pyarrow.int64()),
+                ('reported_cost', pyarrow.float64()), ('calculated_cost', pyarrow.float64())
+            ])
+            self._writer = pyarrow.parquet.ParquetWriter(str(self.path), self._schema)
+            self._batch = []
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8', newline='')
+            if self.format == 'csv':
+                import csv
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(self.COLUMNS)
+
+    def iter_rows(self, task_id, records, calculated_costs):
+        """Export rows of one task's records, in COLUMNS order"""
+        for (ts, tokens_in, tokens_out, cache_writes, cache_reads, cost, model_type), calculated_cost in zip(
+                records, calculated_costs):
+            yield (ts, task_id, model_type, tokens_in, tokens_out, cache_writes, cache_reads, cost, calculated_cost)
+
+    def write(self, task_id, records, calculated_costs):
+        rows = self.iter_rows(task_id, records, calculated_costs)
+        if self.format == 'csv':
+            self._csv.writerows(rows)
+        elif self.format == 'jsonl':
+            columns = self.COLUMNS
+            self._file.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+        else:
+            self._batch.extend(rows)
+            if len(self._batch) >= self.PARQUET_BATCH_SIZE:
+                self._flush_parquet()
+        self.rows += len(records)
+
+    def _flush_parquet(self):
+        if self._batch:
+            columns = list(zip(*self._batch))
+            self._writer.write_table(self._pyarrow.Table.from_arrays(
+                [self._pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        if self.format == 'parquet':
+            self._flush_parquet()
+            self._writer.close()
+        else:
+            self._file.close()
+
+def calculate_token_usage(base_paths, silent=False, cache=None, jobs=1, aggregator=None, timings=None, exporter=None,
+                          scan_filter=None, ranking=None, budget=None):
+    """
+    Calculate total token usage from ui_messages.json files in subdirectories
+    that contain Claude Code tasks (filtered by task_metadata.json and model_id),
+    under one tasks directory or a list of them.
+    When a ScanCache is given, only new or changed task folders are re-parsed;
+    with jobs > 1 they are parsed in parallel, with the same totals as a serial run.
+    Every record is fed once to the UsageAggregator, whose model totals are returned.
+    A PhaseTimings passed as `timings` collects the time and counters of each phase,
+    and a RequestExporter receives every task's records as soon as they are read.
+    A ScanFilter restricts the scan to a time window, tasks or a workspace, and a
+    TaskRanking keeps the top tasks and workspace totals. Files that could not be
+    read completely are counted by error category in the aggregator, and a
+    ScanBudget caps each file's size and read time. Cache writes are committed as
+    the scan goes, so an interrupted scan resumes where it stopped.
+    """
+    if aggregator is None:
+        aggregator = UsageAggregator()
+    # Track totals by model type
+    model_totals = aggregator.model_totals
+    
+    file_count = 0
+    entry_count = 0
+    skipped_count = 0
+    request_data = RequestTable()
+    timestamps = request_data.timestamp
+    
+    base_paths = as_task_roots(base_paths)
+    
+    for base_path in base_paths:
+        if not base_path.exists() and not silent:
+            print(f"Error: Path {base_path} does not exist")
+    base_paths = [base_path for base_path in base_paths if base_path.exists()]
+    if not base_paths:
+        return model_totals, file_count, entry_count, skipped_count, timestamps, request_data
+    
+    profiling = timings is not None
+    if not profiling:
+        timings = PhaseTimings()
+    
+    try:
+        for folder, _, result in iter_task_results(base_paths, cache=cache, jobs=jobs, timings=timings if profiling else None,
+                                                scan_filter=scan_filter, budget=budget):
+            if result['status'] == 'skipped':
+                skipped_count += 1
+                timings.skip(result['message'] or "not a Claude Code task")
+                continue
+            aggregator.count_result_errors(result)
+            if result['error'] is not None:
+                timings.count('errors')
+            if result['message'] is not None and not silent:
+                print(result['message'])
+            if result['status'] == 'error':
+                continue
+            
+            file_count += 1
+            if not silent:
+                print(f"Processing: {folder / 'ui_messages.json'}")
+            
+            with timings.phase('aggregation'):
+                records = result['records']
+                calculated_costs = aggregator.add_records(records)
+                entry_count += len(records)
+                
+                for record in records:
+                    if record[0] is not None:
+                        request_data.append(*record)
+                
+                if ranking is not None:
+                    ranking.add(folder.name, result['workspace'], records, calculated_costs)
+            
+            if exporter is not None:
+                with timings.phase('request export'):
+                    exporter.write(folder.name, records, calculated_costs)
+        timings.count('requests counted', entry_count)
+    finally:
+        # Also reached on Ctrl+C, keeping every folder parsed so far for the next run
+        if cache is not None:
+            with timings.phase('cache'):
+                cache.commit()
+    
+    return model_totals, file_count, entry_count, skipped_count, timestamps, request_data
+
+class LiveUsage:
+    """
+    Usage kept in memory for watch mode: every task folder holds its records, and
+    one running UsageAggregator is updated with the difference whenever a task
+    changes. A changed ui_messages.json is only re-read from the opening of its
+    last api_req_started entry (which Cline rewrites in place once the request
+    completes), so only bytes appended since the last read are parsed and only
+    the records after it are taken back and re-added
+    """
+    PREFIX_CHECK_SIZE = 64
+
+    def __init__(self, base_paths, cache=None, jobs=1, aggregator=None):
+        self.base_paths = as_task_roots(base_paths)
+        self.tasks = {}
+        self.task_folders = {}  # task ID -> folder of the tracked copy
+        self.aggregator = aggregator if aggregator is not None else UsageAggregator()
+        self._bounds_changed = False
+        
+        existing_paths = [base_path for base_path in self.base_paths if base_path.exists()]
+        if existing_paths:
+            # Signatures from before each parse: a task written meanwhile differs from it and is read again
+            for folder, signature, result in iter_task_results(existing_paths, cache=cache, jobs=jobs):
+                self._store(folder, signature, result)
+            if cache is not None:
+                cache.commit()
+
+    def _remove(self, folder, kept=0):
+        """
+        Take a tracked task's records after the first `kept` out of the running
+        aggregator, with its error and totals; returns the calculated cost of the kept ones
+        """
+        state = self.tasks.get(folder)
+        if state is None:
+            return 0.0
+        aggregator = self.aggregator
+        removed_costs = aggregator.remove_records(state['result']['records'][kept:] if state['result']['status'] == 'ok' else [])
+        aggregator.count_result_errors(state['result'], -1)
+        aggregator.replace_task_total(state['totals'], None)
+        self._bounds_changed = True
+        return state['totals'][1] - sum(removed_costs) if state['totals'] is not None else 0.0
+
+    def _store(self, folder, signature, result, tail_offset=0, tail_index=0, kept=0, tail_invalid=0):
+        aggregator = self.aggregator
+        kept_cost = self._remove(folder, kept)
+        records = result['records'] if result['status'] == 'ok' else []
+        calculated_costs = aggregator.add_records(records[kept:], task_total=False)
+        totals = (sum(record[1] + record[2] for record in records), kept_cost + sum(calculated_costs)) if records else None
+        aggregator.replace_task_total(None, totals)
+        aggregator.count_result_errors(result)
+        timestamps = [record[0] for record in records if record[0] is not None]
+        
+        # Remember the bytes just before the tail so a rewritten history is detected
+        tail_prefix = b''
+        if tail_offset:
+            try:
+                with open(folder / "ui_messages.json", 'rb') as f:
+                    f.seek(max(tail_offset - self.PREFIX_CHECK_SIZE, 0))
+                    tail_prefix = f.read(min(tail_offset, self.PREFIX_CHECK_SIZE))
+            except OSError:
+                tail_offset = tail_index = 0
+        
+        self.task_folders[folder.name] = folder
+        self.tasks[folder] = {
+            'signature': signature,
+            'result': result,
+            'totals': totals,
+            'first_ts': min(timestamps) if timestamps else None,
+            'last_ts': max(timestamps) if timestamps else None,
+            'tail_offset': tail_offset,
+            'tail_index': tail_index,
+            'tail_invalid': tail_invalid,  # whether the tail entry is malformed, as it is read again
+            'tail_prefix': tail_prefix
+        }
+
+    def _tail_is_intact(self, json_file, state):
+        try:
+            with open(json_file, 'rb') as f:
+                f.seek(max(state['tail_offset'] - self.PREFIX_CHECK_SIZE, 0))
+                return f.read(len(state['tail_prefix'])) == state['tail_prefix']
+        except OSError:
+            return False
+
+    def _select_copy(self, folder):
+        """
+        The copy of a task to track, which is the one with the largest ui_messages.json
+        when several roots hold the same task ID, along with its signature
+        """
+        if len(self.base_paths) == 1:
+            return folder, get_task_signature(folder)
+        copies = [(base_path / folder.name, get_task_signature(base_path / folder.name)) for base_path in self.base_paths]
+        return max(copies, key=lambda copy: ui_messages_size(copy[1]))
+
+    def refresh(self, folder):
+        """
+        Bring one task folder up to date after a change. Returns False when the
+        files could not be read completely (usually mid-write) and should be retried.
+        """
+        folder, signature = self._select_copy(folder)
+        tracked = self.task_folders.get(folder.name)
+        if tracked is not None and (tracked != folder or signature is None):
+            # The task is gone, or another root now holds its most complete copy
+            del self.task_folders[folder.name]
+            self._remove(tracked)
+            self.tasks.pop(tracked, None)
+        if signature is None:
+            return True
+        
+        state = self.tasks.get(folder)
+        if state is not None and state['signature'] == signature:
+            return True
+        
+        metadata_unchanged = (state is not None and state['result']['status'] == 'ok' and
+                              state['signature'].split(':')[:2] == signature.split(':')[:2])
+        if metadata_unchanged:
+            model_ids = state['result']['model_ids']
+        else:
+            try:
+                model_ids = get_task_model_ids(folder / "task_metadata.json")
+            except (OSError, ValueError):
+                # parse_task_folder reports the metadata error category
+                self._store(folder, signature, parse_task_folder(folder))
+                return True
+            if not model_ids:
+                self._store(folder, signature, skipped_task_result())
+                return True
+        models = classify_models(model_ids)
+        
+        json_file = folder / "ui_messages.json"
+        offset, index, records = 0, 0, []
+        if metadata_unchanged and state['tail_offset'] and self._tail_is_intact(json_file, state):
+            offset, index, records = state['tail_offset'], state['tail_index'], state['result']['records']
+        
+        try:
+            entries = list(iter_api_req_entries_fast(json_file, offset=offset))
+        except EntryLayoutError:
+            result = parse_task_folder(folder)
+            if result['status'] == 'error':
+                return False
+            self._store(folder, signature, result)
+            return True
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+            return False
+        
+        new_records = []
+        tail_offset, tail_index = offset, index
+        invalid_entries = state['result']['invalid_entries'] - state['tail_invalid'] if offset else 0
+        tail_invalid = 0
+        for entry_offset, entry in entries:
+            tail_offset, tail_index = entry_offset, index + len(new_records)
+            record = get_api_req_record(entry)
+            tail_invalid = int(record is None)
+            if record is not None:
+                new_records.append(record)
+            invalid_entries += tail_invalid
+        records = records[:index] + attribute_records(new_records, models)
+        
+        workspace = state['result']['workspace'] if index else None
+        if workspace is None:
+            workspace = find_task_workspace(entry for _, entry in entries)
+        result = dict(skipped_task_result(), status='ok', model_type=models[0][1], models=models, model_ids=model_ids,
+                      records=records, workspace=workspace, invalid_entries=invalid_entries)
+        self._store(folder, signature, result, tail_offset, tail_index, kept=index, tail_invalid=tail_invalid)
+        return True
+
+    def aggregate(self):
+        """The running UsageAggregator over every tracked task"""
+        if self._bounds_changed:
+            # Removed records can't narrow the first/last timestamps, so they are recomputed from the tasks
+            aggregator = self.aggregator
+            firsts = [state['first_ts'] for state in self.tasks.values() if state['first_ts'] is not None]
+            aggregator.first_ts = min(firsts) if firsts else None
+            aggregator.last_ts = max(state['last_ts'] for state in self.tasks.values() if state['last_ts'] is not None) if firsts else None
+            self._bounds_changed = False
+        return self.aggregator
+
+    def request_table(self):
+        """RequestTable of every tracked request with a timestamp, as calculate_token_usage returns it"""
+        request_data = RequestTable()
+        for state in self.tasks.values():
+            if state['result']['status'] == 'ok':
+                for record in state['result']['records']:
+                    if record[0] is not None:
+                        request_data.append(*record)
+        return request_data
+
+    def counts(self):
+        """(task files counted, folders skipped, requests) as calculate_token_usage reports them"""
+        file_count = skipped_count = entry_count = 0
+        for state in self.tasks.values():
+            status = state['result']['status']
+            if status == 'ok':
+                file_count += 1
+                entry_count += len(state['result']['records'])
+            elif status == 'skipped':
+                skipped_count += 1
+        return file_count, skipped_count, entry_count
+
+    def folders(self):
+        """Every task folder currently under the tasks directories"""
+        return {folder for base_path in self.base_paths if base_path.exists()
+                for folder in base_path.iterdir() if folder.is_dir()}
+
+    def refresh_changed(self, changed, pending=()):
+        """
+        Refresh the folders a watcher reported changed (None for all of them) and
+        the pending ones; returns those caught mid-write, to retry on the next pass
+        """
+        if changed is None:
+            changed = self.folders() | set(self.tasks)
+        return {folder for folder in set(pending) | changed if not self.refresh(folder)}
+
+class InotifyWatcher:
+    """
+    Linux inotify watches on the tasks directories and every task folder in them,
+    reporting folders whose task files were written or replaced
+    """
+    name = "inotify"
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    WATCHED_FILES = (b"ui_messages.json", b"task_metadata.json")
+
+    def __init__(self, base_paths):
+        import ctypes
+        import ctypes.util
+        
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(self._libc, 'inotify_init'):
+            raise OSError("inotify is not available on this platform")
+        self.fd = self._libc.inotify_init()
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        
+        self.roots = {}  # watch descriptor -> tasks directory
+        self.folders = {}  # watch descriptor -> task folder
+        try:
+            for base_path in as_task_roots(base_paths):
+                self.roots[self._add_watch(base_path, self.IN_CREATE | self.IN_MOVED_TO | self.IN_DELETE)] = base_path
+                for folder in base_path.iterdir():
+                    if folder.is_dir():
+                        self.add(folder)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            errno = self._ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def add(self, folder):
+        self.folders[self._add_watch(folder, self.IN_CLOSE_WRITE | self.IN_MOVED_TO)] = folder
+
+    def changes(self, timeout):
+        """
+        Wait up to timeout seconds and return the set of changed task folders,
+        or None if the kernel queue overflowed and everything must be rechecked
+        """
+        import select
+        import struct
+        
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            data = os.read(self.fd, 65536)
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = struct.unpack_from('iIII', data, pos)
+                name = data[pos + 16:pos + 16 + length].rstrip(b'\0')
+                pos += 16 + length
+                
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if wd in self.roots:
+                    folder = self.roots[wd] / os.fsdecode(name)
+                    if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        try:
+                            self.add(folder)
+                        except OSError:
+                            pass
+                    changed.add(folder)
+                elif wd in self.folders and name in self.WATCHED_FILES:
+                    changed.add(self.folders[wd])
+            # Coalesce bursts of writes into a single refresh
+            ready, _, _ = select.select([self.fd], [], [], 0.05)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Portable fallback that compares task file signatures every poll"""
+    name = "polling"
+
+    def __init__(self, base_paths):
+        self.base_paths = as_task_roots(base_paths)
+        self.signatures = self._snapshot()
+
+    def _snapshot(self):
+        return {folder: get_task_signature(folder) for base_path in self.base_paths if base_path.exists()
+                for folder in base_path.iterdir() if folder.is_dir()}
+
+    def changes(self, timeout):
+        time.sleep(timeout)
+        snapshot = self._snapshot()
+        changed = {folder for folder in set(snapshot) | set(self.signatures)
+                   if snapshot.get(folder) != self.signatures.get(folder)}
+        self.signatures = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+def open_tasks_watcher(base_paths):
+    """Watch the tasks directories with inotify where available, polling otherwise"""
+    try:
+        return InotifyWatcher(base_paths)
+    except (OSError, AttributeError):
+        return PollingWatcher(base_paths)
+
+USAGE_ENDPOINTS = ('/health', '/today', '/month', '/daily', '/monthly', '/summary', '/report')
+
+def usage_query(live_usage, path, watcher_name):
+    """
+    (HTTP status, JSON-ready body) answering a `CCC.py serve` query from the
+    in-memory usage; /summary and /report match --emit and --format json, and
+    /report?plans (optionally with plan_limits=5H,7D) adds --plans' comparison
+    """
+    from datetime import datetime
+    from urllib.parse import urlsplit, parse_qs
+    
+    url = urlsplit(path)
+    endpoint = url.path.rstrip('/') or '/health'
+    aggregator = live_usage.aggregate()
+    now = datetime.now()
+    
+    if endpoint == '/health':
+        return 200, {'version': VERSION, 'tasks': len(live_usage.tasks), 'watcher': watcher_name,
+                     'base_paths': [str(base_path) for base_path in live_usage.base_paths],
+                     'time': now.isoformat(timespec='seconds'), 'endpoints': list(USAGE_ENDPOINTS)}
+    if endpoint in ('/today', '/month'):
+        key, field = (now.date(), 'date') if endpoint == '/today' else (now.strftime('%Y-%m'), 'month')
+        buckets = aggregator.days if endpoint == '/today' else aggregator.months
+        period = summarize_monthly_groups({key: buckets.get(key, [0, 0, 0, 0, 0, 0.0])})[key]
+        return 200, dict({field: str(key)}, **period)
+    if endpoint == '/daily':
+        daily_stats = aggregator.daily_stats()
+        if 'dates' in daily_stats:
+            daily_stats['dates'] = sorted(date.isoformat() for date in daily_stats['dates'])
+        days = {date.isoformat(): period for date, period in sorted(summarize_monthly_groups(aggregator.days).items())}
+        return 200, {'daily_stats': daily_stats, 'days': days}
+    if endpoint == '/monthly':
+        return 200, {'monthly_costs': dict(sorted(aggregator.monthly_costs().items()))}
+    
+    file_count, skipped_count, entry_count = live_usage.counts()
+    if endpoint == '/summary':
+        return 200, build_usage_summary(aggregator, file_count, skipped_count, entry_count)
+    if endpoint == '/report':
+        query = parse_qs(url.query, keep_blank_values=True)
+        plan_limits = None
+        if query.get('plan_limits'):
+            try:
+                plan_limits = parse_plan_limits(query['plan_limits'][0])
+            except ValueError as e:
+                return 400, {'error': f"invalid plan_limits: {e}"}
+        request_data = live_usage.request_table()
+        plans = None
+        if 'plans' in query or plan_limits:
+            plans = simulate_plans(request_data, [("current", dict(PRICING.vectors))], plan_limits)
+        rolling = calculate_rolling_windows(request_data, calculate_model_cost(aggregator.model_totals)[0])
+        return 200, report_to_json(build_report(aggregator, file_count, skipped_count, entry_count, live_usage.base_paths,
+                                                plans=plans, rolling=rolling))
+    return 404, {'error': f"unknown endpoint {endpoint}", 'endpoints': list(USAGE_ENDPOINTS)}
+
+def summarize_usage_period(calculated_cost, first_ts, last_ts):
+    """Monthly average, time span in days and date range for usage between two timestamps"""
+    if first_ts is None:
+        return 0, 0, "No usage data found"
+    
+    from datetime import datetime
+    
+    earliest_date = datetime.fromtimestamp(first_ts / 1000)
+    latest_date = datetime.fromtimestamp(last_ts / 1000)
+    time_span = (latest_date - earliest_date).days
+    
+    if time_span == 0:
+        return calculated_cost * 30, time_span, f"All usage on {earliest_date.strftime('%Y-%m-%d')}"
+    
+    months_span = time_span / 30.44
+    monthly_average = calculated_cost / months_span if months_span > 0 else calculated_cost
+    date_range = f"{earliest_date.strftime('%Y-%m-%d')} to {latest_date.strftime('%Y-%m-%d')}"
+    
+    return monthly_average, time_span, date_range
+
+def calculate_monthly_average(calculated_cost, timestamps):
+    if not timestamps:
+        return 0, 0, "No usage data found"
+    
+    return summarize_usage_period(calculated_cost, min(timestamps), max(timestamps))
+
+def calculate_daily_usage_stats(request_data, model_costs):
+    """
+    Calculate daily usage statistics based on actual request data with model-specific pricing
+    """
+    if not request_data:
+        return {}
+    
+    # Group actual data by date, pricing every request with its model's rates
+    return summarize_daily_groups(request_data.group_by(request_data.day_keys(), request_data.priced_costs(model_costs)))
+
+def summarize_daily_groups(daily_groups):
+    """
+    Daily usage statistics from per-date [requests, tokensIn, tokensOut, cacheWrites,
+    cacheReads, cost] groups
+    """
+    if not daily_groups:
+        return {}
+    
+    # Calculate statistics based on actual data
+    costs = [group[5] for group in daily_groups.values()]
+    tokens = [group[1] + group[2] for group in daily_groups.values()]  # in + out
+    requests = [group[0] for group in daily_groups.values()]
+    
+    stats = {
+        'total_active_days': len(costs),
+        'avg_daily_cost': sum(costs) / len(costs),
+        'max_daily_cost': max(costs),
+        'min_daily_cost': min(costs),
+        'avg_daily_tokens': sum(tokens) / len(tokens),
+        'max_daily_tokens': max(tokens),
+        'avg_daily_requests': sum(requests) / len(requests),
+        'max_daily_requests': max(requests),
+        'dates': list(daily_groups.keys())
+    }
+    
+    return stats
+
+def get_model_name(model_type):
+    """Display name for a model type"""
+    return MODEL_REGISTRY.name(model_type)
+
+def get_combined_totals(model_totals):
+    """Combine all model totals for display"""
+    combined = {
+        'tokensIn': sum(m['tokensIn'] for m in model_totals.values()),
+        'tokensOut': sum(m['tokensOut'] for m in model_totals.values()),
+        'cacheWrites': sum(m['cacheWrites'] for m in model_totals.values()),
+        'cacheReads': sum(m['cacheReads'] for m in model_totals.values()),
+        'cost': sum(m['cost'] for m in model_totals.values())
+    }
+    return combined
+
+def calculate_monthly_costs(request_data, model_costs):
+    """Calculate monthly cost breakdown from request data"""
+    if not request_data:
+        return {}
+    
+    return summarize_monthly_groups(request_data.group_by(request_data.month_keys(), request_data.priced_costs(model_costs)))
+
+# Rolling windows subscription usage limits are enforced over, as (label, milliseconds)
+ROLLING_WINDOWS = (('5 hours', 5 * 3_600_000), ('24 hours', 24 * 3_600_000), ('7 days', 7 * 86_400_000))
+
+def calculate_rolling_windows(request_data, model_costs, now=None):
+    """
+    Spend, API calls and tokens over rolling ROLLING_WINDOWS: the window ending
+    now and the busiest window of the history, found with prefix sums and two
+    pointers over the sorted timestamps in linear time after the sort. Also a
+    month-end forecast: month-to-date spend plus the last 7 days' daily rate
+    over the days left in the month.
+    """
+    from datetime import datetime
+    from itertools import accumulate
+    
+    now = datetime.now() if now is None else now
+    now_ms = int(now.timestamp() * 1000)
+    costs = request_data.priced_costs(model_costs) if request_data else []
+    order = sorted(range(len(request_data)), key=request_data.timestamp.__getitem__)
+    timestamps = [request_data.timestamp[i] for i in order]
+    # prefix[i] is the sum of the first i requests in time order
+    cost_prefix = [0.0] + list(accumulate(costs[i] for i in order))
+    token_prefix = [0] + list(accumulate(request_data.tokens_in[i] + request_data.tokens_out[i] for i in order))
+    
+    # Requests logged up to now; clock skew between machines can put a few later
+    until_now = bisect_right(timestamps, now_ms)
+    windows = []
+    for label, span in ROLLING_WINDOWS:
+        peak = None
+        start = 0
+        for end, ts in enumerate(timestamps):
+            # Requests in (ts - span, ts] make up the window ending at this request
+            while timestamps[start] <= ts - span:
+                start += 1
+            cost = cost_prefix[end + 1] - cost_prefix[start]
+            if peak is None or cost > peak[0]:
+                peak = (cost, start, end)
+        current = bisect_right(timestamps, now_ms - span)
+        windows.append({
+            'window': label,
+            'hours': span / 3_600_000,
+            'current_cost': cost_prefix[until_now] - cost_prefix[current],
+            'current_requests': until_now - current,
+            'current_tokens': token_prefix[until_now] - token_prefix[current],
+            'peak_cost': peak[0] if peak else 0.0,
+            'peak_requests': peak[2] - peak[1] + 1 if peak else 0,
+            'peak_tokens': token_prefix[peak[2] + 1] - token_prefix[peak[1]] if peak else 0,
+            'peak_start_ts': timestamps[peak[1]] if peak else None,
+            'peak_end_ts': timestamps[peak[2]] if peak else None
+        })
+    
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start.replace(year=month_start.year + 1, month=1) if month_start.month == 12
+                  else month_start.replace(month=month_start.month + 1))
+    month_to_date = cost_prefix[until_now] - cost_prefix[bisect_right(timestamps, int(month_start.timestamp() * 1000) - 1)]
+    daily_rate = windows[-1]['current_cost'] / 7
+    days_left = (next_month - now).total_seconds() / 86_400
+    return {
+        'windows': windows,
+        'forecast': {
+            'month': month_start.strftime('%Y-%m'),
+            'month_to_date': month_to_date,
+            'daily_rate': daily_rate,
+            'days_left': days_left,
+            'month_end': month_to_date + daily_rate * days_left
+        }
+    }
+
+def summarize_monthly_groups(monthly_groups):
+    """Monthly cost breakdown from per-month [requests, tokensIn, tokensOut, ..., cost] groups"""
+    return {
+        month_key: {  # e.g., "2025-01"
+            'api_calls': group[0],
+            'total_tokens': group[1] + group[2],
+            'total_cost': group[5]
+        }
+        for month_key, group in monthly_groups.items()
+    }
+
+# Monthly fee of each plan, the model type prefixes it leaves to API billing (None: every
+# model) and its usage relative to Pro, which scales --plan-limits (None: unlimited)
+SUBSCRIPTION_PLANS = (
+    {'key': 'api', 'name': "API", 'fee': 0.0, 'api_models': None, 'usage': None},
+    {'key': 'pro', 'name': "Pro", 'fee': 20.0, 'api_models': ('claude-opus',), 'usage': 1},  # no Opus in Claude Code on Pro
+    {'key': 'max5x', 'name': "Max 5x", 'fee': 100.0, 'api_models': (), 'usage': 5},
+    {'key': 'max20x', 'name': "Max 20x", 'fee': 200.0, 'api_models': (), 'usage': 20}
+)
+# Rolling windows --plan-limits gives Pro's limits for, in order
+PLAN_LIMIT_WINDOWS = ('5 hours', '7 days')
+
+# Named --what-if scenarios: model type prefixes ('*' for all) priced with another model's rates
+WHAT_IF_PRESETS = {
+    'opus-as-sonnet': "claude-opus=claude-sonnet-4",
+    'all-sonnet': "*=claude-sonnet-4",
+    'all-haiku': "*=claude-3-5-haiku"
+}
+
+def parse_what_if(spec):
+    """
+    (name, rate vectors by model type) of a --what-if scenario: a WHAT_IF_PRESETS
+    name, comma-separated FROM=TO model type remappings, or a JSON/TOML pricing file
+    """
+    vectors = dict(PRICING.vectors)
+    remap = WHAT_IF_PRESETS.get(spec, spec)
+    if '=' not in remap:
+        return spec, PricingEngine(load_pricing_file(spec)).vectors
+    for item in remap.split(','):
+        source, _, target = (part.strip() for part in item.partition('='))
+        if target not in PRICING.vectors:
+            raise ValueError(f"no rates for {target!r} in {spec!r}")
+        for model_type in MODEL_TYPES:
+            if source == '*' or model_type.startswith(source):
+                vectors[model_type] = PRICING.vectors[target]
+    return spec, vectors
+
+# Plan limit windows are slid by a twentieth of their span
+WINDOW_STEPS = 20
+
+def parse_plan_limits(spec):
+    """
+    Pro's usage limits from a --plan-limits value: the API-rate spend in dollars it
+    allows per PLAN_LIMIT_WINDOWS window, comma-separated (e.g. "10,75")
+    """
+    limits = [float(value) for value in spec.split(',')]
+    if len(limits) != len(PLAN_LIMIT_WINDOWS) or min(limits) <= 0:
+        raise ValueError(f"expected {len(PLAN_LIMIT_WINDOWS)} positive dollar amounts, for {' and '.join(PLAN_LIMIT_WINDOWS)}")
+    return dict(zip(PLAN_LIMIT_WINDOWS, limits))
+
+def cost_weights(vectors, codes, api_models=None):
+    """
+    Weights turning the (tokensIn, tokensOut, cacheWrites, cacheReads, cost) sums of
+    each model code in `codes` into a cost under a scenario's rate vectors: models
+    without rates keep their reported cost, and models starting with one of
+    `api_models` (those a plan leaves to API billing) count for nothing
+    """
+    weights = []
+    for code in codes:
+        model_type = MODEL_TYPES[code]
+        rates = vectors.get(model_type)
+        if api_models is not None and model_type.startswith(api_models):
+            weights.extend((0.0, 0.0, 0.0, 0.0, 0.0))
+        elif rates is None:
+            weights.extend((0.0, 0.0, 0.0, 0.0, 1.0))
+        else:
+            weights.extend([rate / 1_000_000 for rate in rates] + [0.0])
+    return weights
+
+def window_sums(request_data, month_keys, codes, span):
+    """
+    Flat (tokensIn, tokensOut, cacheWrites, cacheReads, cost) sums of each model
+    code in `codes` over the rolling windows of span milliseconds ending at every
+    step of span / WINDOW_STEPS that holds requests, grouped by the month the
+    window ends in, so a peak can differ from the exact rolling one by the requests
+    of one step. One pass over the requests; cost_weights then prices every
+    window of any scenario without going back to them.
+    """
+    step = span // WINDOW_STEPS
+    slots = {code: i * 5 for i, code in enumerate(codes)}
+    width = len(codes) * 5
+    buckets = {}  # step index -> [sums, last timestamp, month of the last request]
+    for ts, code, tokens_in, tokens_out, cache_writes, cache_reads, cost, month in zip(
+            request_data.timestamp, request_data.model, request_data.tokens_in, request_data.tokens_out,
+            request_data.cache_writes, request_data.cache_reads, request_data.cost, month_keys):
+        bucket = buckets.get(ts // step)
+        if bucket is None:
+            bucket = buckets[ts // step] = [[0] * width, ts, month]
+        sums = bucket[0]
+        slot = slots[code]
+        sums[slot] += tokens_in
+        sums[slot + 1] += tokens_out
+        sums[slot + 2] += cache_writes
+        sums[slot + 3] += cache_reads
+        sums[slot + 4] += cost
+        if ts >= bucket[1]:
+            bucket[1] = ts
+            bucket[2] = month
+    
+    windows = {}
+    running = [0] * width
+    steps = sorted(buckets)
+    start = 0
+    for index in steps:
+        running = [total + value for total, value in zip(running, buckets[index][0])]
+        # Steps in (index - WINDOW_STEPS, index] make up the window ending at this one
+        while steps[start] <= index - WINDOW_STEPS:
+            running = [total - value for total, value in zip(running, buckets[steps[start]][0])]
+            start += 1
+        windows.setdefault(buckets[index][2], []).append(tuple(running))
+    return windows
+
+def simulate_plans(request_data, scenarios, limits=None):
+    """
+    Replay the request table against every plan of SUBSCRIPTION_PLANS under each
+    (name, rate vectors) scenario. Costs are linear in tokens, so the requests are
+    summed once per (month, model) and per (rolling window, model), and each
+    scenario is then priced from those sums alone: its cost depends on the number
+    of months and windows, not of requests. Each month is billed whole and the
+    'mixed' plan takes the cheapest plan month by month. Usage limits are only
+    modeled when `limits` gives Pro's (see parse_plan_limits): a plan whose busiest
+    window of a month then costs more at API rates than its scaled limit is
+    flagged over limit that month and left out of 'mixed' and the best plan.
+    """
+    from operator import mul
+    
+    month_keys = request_data.month_keys()
+    groups = request_data.group_by(list(zip(month_keys, request_data.model)), request_data.cost)
+    months = sorted({month for month, _ in groups})
+    plan_keys = [plan['key'] for plan in SUBSCRIPTION_PLANS] + ['mixed']
+    codes = sorted(set(request_data.model))
+    spans = dict(ROLLING_WINDOWS)
+    plans = [dict(plan, window_limits={label: limit * plan['usage'] for label, limit in limits.items()}
+                  if limits and plan['usage'] else None) for plan in SUBSCRIPTION_PLANS]
+    windows = {label: window_sums(request_data, month_keys, codes, spans[label]) for label in limits or ()}
+    
+    results = []
+    for name, vectors in scenarios:
+        weights = cost_weights(vectors, codes)
+        model_weights = {code: weights[i * 5:i * 5 + 5] for i, code in enumerate(codes)}
+        monthly = {month: {plan['key']: plan['fee'] for plan in SUBSCRIPTION_PLANS} for month in months}
+        for (month, code), group in groups.items():
+            model_type = MODEL_TYPES[code]
+            cost = sum(map(mul, group[1:6], model_weights[code]))
+            for plan in SUBSCRIPTION_PLANS:
+                if plan['api_models'] is None or model_type.startswith(tuple(plan['api_models'])):
+                    monthly[month][plan['key']] += cost
+        
+        # Window peaks of the models each plan covers, shared by plans covering the same models
+        over_limit = {month: [] for month in months}
+        peaks = {}
+        for plan in plans:
+            if not plan['window_limits']:
+                continue
+            api_models = tuple(plan['api_models'])
+            covered_weights = cost_weights(vectors, codes, api_models)
+            for label, limit in plan['window_limits'].items():
+                key = (api_models, label)
+                if key not in peaks:
+                    peaks[key] = {month: max(sum(map(mul, sums, covered_weights)) for sums in month_windows)
+                                  for month, month_windows in windows[label].items()}
+                for month, peak in peaks[key].items():
+                    if peak > limit and plan['key'] not in over_limit[month]:
+                        over_limit[month].append(plan['key'])
+        for month, costs in monthly.items():
+            costs['mixed'] = min(cost for key, cost in costs.items() if key not in over_limit[month])
+        
+        totals = {key: sum(costs[key] for costs in monthly.values()) for key in plan_keys}
+        within_limits = [plan['key'] for plan in SUBSCRIPTION_PLANS
+                         if not any(plan['key'] in keys for keys in over_limit.values())]
+        results.append({
+            'name': name,
+            'monthly': monthly,
+            'over_limit': {month: keys for month, keys in over_limit.items() if keys},
+            'total': totals,
+            'monthly_average': {key: total / len(months) if months else 0.0 for key, total in totals.items()},
+            'savings_vs_api': {key: totals['api'] - total for key, total in totals.items()},
+            'best_plan': min(within_limits, key=totals.__getitem__) if months else None
+        })
+    
+    return {
+        'plans': [dict(plan, api_models=list(plan['api_models']) if plan['api_models'] is not None else None)
+                  for plan in plans],
+        'limits': limits,
+        'months': months,
+        'scenarios': results
+    }
+
+SUMMARY_FORMAT = "ccc-summary"
+SUMMARY_VERSION = 1
+
+def build_usage_summary(aggregator, file_count, skipped_count, entry_count):
+    """
+    Machine-readable summary of a run for --emit: counts, the calculated cost of
+    each model and the aggregator's totals and buckets. Calculated costs are
+    stored, so summaries merge without knowing each host's pricing.
+    """
+    import socket
+    from datetime import datetime
+    
+    model_costs, total_calculated_cost = calculate_model_cost(aggregator.model_totals)
+    usage = aggregator.to_dict()
+    if aggregator.tz is None:
+        # Other machines' local time may differ: record which one this grid is in
+        usage['heatmap']['timezone'] = f"local ({local_timezone_name()})"
+    return {
+        'format': SUMMARY_FORMAT,
+        'version': SUMMARY_VERSION,
+        'ccc_version': VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'hosts': [socket.gethostname()],
+        'files': file_count,
+        'skipped': skipped_count,
+        'requests': entry_count,
+        'model_costs': {model_type: model_cost['calculated_cost'] for model_type, model_cost in model_costs.items()
+                        if aggregator.model_totals[model_type]['count']},
+        'total_calculated_cost': total_calculated_cost,
+        'usage': usage
+    }
+
+def open_summary_file(path, mode):
+    """Open a summary for text reading or writing, gzip-compressed when it ends in .gz"""
+    if str(path).endswith('.gz'):
+        import gzip
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def write_summary(summary, path):
+    if path == '-':
+        import sys
+        json.dump(summary, sys.stdout, separators=(',', ':'))
+        sys.stdout.write('\n')
+        return
+    with open_summary_file(path, 'w') as f:
+        json.dump(summary, f, separators=(',', ':'))
+
+def read_summary(path):
+    """Load a summary written by --emit or merge, raising ValueError if it isn't one"""
+    with open_summary_file(path, 'r') as f:
+        summary = json.load(f)
+    if not isinstance(summary, dict) or summary.get('format') != SUMMARY_FORMAT:
+        raise ValueError("not a CCC summary")
+    if summary.get('version') != SUMMARY_VERSION:
+        raise ValueError(f"unsupported summary version {summary.get('version')}")
+    return summary
+
+def iter_summary_paths(paths):
+    """Summary files given directly, and the .json / .json.gz files of given directories, sorted"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(p for p in path.iterdir() if p.name.endswith(('.json', '.json.gz')))
+        else:
+            yield path
+
+def merge_summaries(paths):
+    """
+    Combine summaries one file at a time, so memory stays bounded by the number
+    of days and models rather than the number of files. Returns the merged
+    summary and the (path, error) of every file that could not be read. The
+    time zone of each summary's heatmap is listed in `heatmap_timezones`.
+    """
+    from datetime import datetime
+    
+    aggregator = UsageAggregator()
+    merged = {
+        'format': SUMMARY_FORMAT,
+        'version': SUMMARY_VERSION,
+        'ccc_version': VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'hosts': [],
+        'files': 0,
+        'skipped': 0,
+        'requests': 0,
+        'model_costs': {},
+        'total_calculated_cost': 0.0,
+        'heatmap_timezones': []
+    }
+    failures = []
+    
+    for path in iter_summary_paths(paths):
+        try:
+            summary = read_summary(path)
+            other = UsageAggregator.from_dict(summary['usage'])
+        except (OSError, ValueError, KeyError, TypeError, EOFError) as e:
+            failures.append((path, e))
+            continue
+        
+        aggregator.merge(other)
+        if any(cell[0] for cell in other.heatmap):
+            # A merged summary lists the zones it was merged from
+            for zone in summary.get('heatmap_timezones') or [other.tz_name]:
+                if zone not in merged['heatmap_timezones']:
+                    merged['heatmap_timezones'].append(zone)
+        merged['hosts'].extend(summary['hosts'])
+        for key in ('files', 'skipped', 'requests', 'total_calculated_cost'):
+            merged[key] += summary[key]
+        for model_type, cost in summary['model_costs'].items():
+            merged['model_costs'][model_type] = merged['model_costs'].get(model_type, 0.0) + cost
+    
+    merged['usage'] = aggregator.to_dict()
+    return merged, failures
+
+def build_report(aggregator, file_count, skipped_count, entry_count, base_paths, filters=None, ranking=None, plans=None,
+                 rolling=None):
+    """
+    Every figure of the report, computed once from the aggregator so the rich,
+    plain and JSON outputs and the SVG/HTML exports all render the same stats
+    """
+    model_totals = aggregator.model_totals
+    model_costs, total_calculated_cost = calculate_model_cost(model_totals)
+    combined_totals = get_combined_totals(model_totals)
+    monthly_average, time_span, date_range = aggregator.monthly_average(total_calculated_cost)
+    
+    models = []
+    for model_type, totals in model_totals.items():
+        if totals['count'] > 0:
+            models.append({
+                'model_type': model_type,
+                'name': get_model_name(model_type),
+                'totals': totals,
+                'rates': model_costs[model_type]['rates'],
+                'component_costs': PRICING.component_costs(
+                    model_type, totals['tokensIn'], totals['tokensOut'], totals['cacheWrites'], totals['cacheReads']),
+                'calculated_cost': model_costs[model_type]['calculated_cost']
+            })
+    
+    return {
+        'base_paths': [str(base_path) for base_path in base_paths],
+        'filters': filters,
+        'files': file_count,
+        'skipped': skipped_count,
+        'requests': entry_count,
+        'models': models,
+        'combined_totals': combined_totals,
+        'total_calculated_cost': total_calculated_cost,
+        'monthly_costs': dict(sorted(aggregator.monthly_costs().items())),
+        'period': {'monthly_average': monthly_average, 'time_span': time_span, 'date_range': date_range},
+        'daily_stats': aggregator.daily_stats(),
+        'distributions': aggregator.distribution_stats(),
+        'total_tokens': combined_totals['tokensIn'] + combined_totals['tokensOut'],
+        'total_cache_ops': combined_totals['cacheWrites'] + combined_totals['cacheReads'],
+        'errors': dict(sorted(aggregator.errors.items())),
+        'ranking': {
+            'rank_by': ranking.key,
+            'top_tasks': ranking.top_tasks(),
+            'top_workspaces': ranking.top_workspaces()
+        } if ranking is not None else None,
+        'plans': plans,
+        'rolling': rolling,
+        'heatmap': aggregator.heatmap_stats()
+    }
+
+def report_to_json(report):
+    """The report with JSON-ready values, for --format json"""
+    daily_stats = dict(report['daily_stats'])
+    if 'dates' in daily_stats:
+        daily_stats['dates'] = sorted(date.isoformat() for date in daily_stats['dates'])
+    return dict(report, version=VERSION, daily_stats=daily_stats)
+
+def today_cost(base_paths, cache=None, jobs=1, scan_filter=None):
+    """Calculated API cost of today's requests, for shell prompts and status bars"""
+    model_totals = calculate_token_usage(base_paths, silent=True, cache=cache, jobs=jobs, scan_filter=scan_filter)[0]
+    return calculate_model_cost(model_totals)[1]
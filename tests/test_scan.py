@@ -0,0 +1,355 @@
+"""
+Tests of scanning task folders: the scan cache, parallel parsing, model
+attribution, ScanFilter pushdown and LiveUsage's incremental updates, each
+checked against a plain serial scan or a brute-force equivalent.
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ccc_core
+
+DAY_MS = 86_400_000
+START_TS = 1_735_000_000_000
+MODEL_IDS = ('claude-sonnet-4-20250514', 'claude-opus-4-20250514', 'claude-3-7-sonnet-20250219', 'claude-foo-1')
+
+def make_request(ts, rng, workspace=None):
+    usage = {
+        'request': f"# Current Working Directory ({workspace}) Files" if workspace else "<task>x</task>",
+        'tokensIn': rng.randint(1, 5000),
+        'tokensOut': rng.randint(1, 5000),
+        'cacheWrites': rng.randint(0, 50_000),
+        'cacheReads': rng.randint(0, 500_000),
+        'cost': rng.random()
+    }
+    return {'ts': ts, 'type': 'say', 'say': 'api_req_started', 'text': json.dumps(usage)}
+
+def make_task(rng, start, requests):
+    """task_metadata.json model history and ui_messages.json entries of one task starting at `start`"""
+    workspace = f"/home/u/proj{rng.randrange(3)}"
+    entries = []
+    ts = start
+    for i in range(requests):
+        ts += rng.randint(1, 4 * 3_600_000)
+        if rng.random() < 0.3:
+            entries.append({'ts': ts - 1, 'type': 'say', 'say': 'text', 'text': "a ] bracket"})
+        entries.append(make_request(ts, rng, workspace if i == 0 else None))
+    switches = sorted(rng.sample(range(start, ts + 1), rng.randint(1, 3)))
+    model_usage = [{'ts': switch, 'model_id': rng.choice(MODEL_IDS), 'model_provider_id': 'claude-code'}
+                   for switch in switches]
+    return {'model_usage': model_usage}, entries
+
+def write_task(folder, metadata, entries):
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / 'task_metadata.json').write_text(json.dumps(metadata))
+    (folder / 'ui_messages.json').write_text(json.dumps(entries))
+
+def usage_dict(aggregator):
+    """Aggregator state with its sketches left out, as they hold floats summed in scan order"""
+    data = aggregator.to_dict()
+    data.pop('sketches')
+    return data
+
+class CorpusTestCase(unittest.TestCase):
+    """A tasks directory of generated Claude Code tasks, plus one that isn't and one missing a file"""
+    TASKS = 24
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        self.tasks = self.root / 'tasks'
+        rng = random.Random(self.TASKS)
+        for i in range(self.TASKS):
+            start = START_TS + i * DAY_MS // 2
+            write_task(self.tasks / str(start), *make_task(rng, start, rng.randint(1, 30)))
+        write_task(self.tasks / str(START_TS + 1), {'model_usage': [{'ts': 1, 'model_id': 'gpt', 'model_provider_id': 'openai'}]},
+                   [make_request(START_TS + 2, rng)])
+        (self.tasks / str(START_TS + 3)).mkdir()
+        self.snapshot_pricing()
+
+    def snapshot_pricing(self):
+        # use_pricing rebinds the module's tables, so tests that call it put them back
+        names = ('PRICING', 'MODEL_TYPES', 'MODEL_CODES', 'MODEL_NAMES', 'MODEL_REGISTRY')
+        saved = {name: getattr(ccc_core, name) for name in names}
+        self.addCleanup(lambda: [setattr(ccc_core, name, value) for name, value in saved.items()])
+
+    def open_cache(self):
+        cache = ccc_core.ScanCache(self.root / 'cache.sqlite3')
+        self.addCleanup(cache.close)
+        return cache
+
+    def scan(self, **kwargs):
+        """(model totals, files, requests, skipped, aggregator, request data) of a scan"""
+        aggregator = ccc_core.UsageAggregator()
+        model_totals, file_count, entry_count, skipped_count, _, request_data = ccc_core.calculate_token_usage(
+            self.tasks, silent=True, aggregator=aggregator, **kwargs)
+        return model_totals, file_count, entry_count, skipped_count, aggregator, request_data
+
+    def assert_same_scan(self, scan, expected):
+        self.assertEqual(scan[:4], expected[:4])
+        self.assertEqual(usage_dict(scan[4]), usage_dict(expected[4]))
+        self.assertEqual(list(scan[5]), list(expected[5]))
+
+    def rewrite(self, folder, edit):
+        """Apply `edit` to a task's ui_messages.json entries and write them back"""
+        path = folder / 'ui_messages.json'
+        entries = json.loads(path.read_text())
+        path.write_text(json.dumps(edit(entries)))
+
+class ScanCacheTest(CorpusTestCase):
+    def test_warm_scan_matches_uncached(self):
+        cache = self.open_cache()
+        expected = self.scan()
+        self.assert_same_scan(self.scan(cache=cache), expected)
+        timings = ccc_core.PhaseTimings()
+        self.assert_same_scan(self.scan(cache=cache, timings=timings), expected)
+        self.assertEqual(timings.counters['folders parsed'], 0)
+
+    def test_size_change_invalidates(self):
+        cache = self.open_cache()
+        self.scan(cache=cache)
+        folder = sorted(self.tasks.iterdir())[5]
+        self.rewrite(folder, lambda entries: entries + [make_request(entries[-1]['ts'] + 1, random.Random(1))])
+        timings = ccc_core.PhaseTimings()
+        self.assert_same_scan(self.scan(cache=cache, timings=timings), self.scan())
+        self.assertEqual(timings.counters['folders parsed'], 1)
+
+    def test_mtime_change_invalidates(self):
+        cache = self.open_cache()
+        before = self.scan(cache=cache)
+        folder = sorted(self.tasks.iterdir())[7]
+        path = folder / 'ui_messages.json'
+        stat = path.stat()
+
+        def same_size_edit(entries):
+            # Same number of digits, so only the modification time tells the files apart
+            for entry in entries:
+                if entry['say'] == 'api_req_started':
+                    usage = json.loads(entry['text'])
+                    digits = len(str(usage['tokensIn']))
+                    usage['tokensIn'] = int('9' * digits) if usage['tokensIn'] != int('9' * digits) else int('1' * digits)
+                    entry['text'] = json.dumps(usage)
+                    break
+            return entries
+        self.rewrite(folder, same_size_edit)
+        self.assertEqual(path.stat().st_size, stat.st_size)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        after = self.scan(cache=cache)
+        self.assert_same_scan(after, self.scan())
+        self.assertNotEqual(usage_dict(after[4]), usage_dict(before[4]))
+
+    def test_pricing_change_applies_to_cached_tasks(self):
+        cache = self.open_cache()
+        before = ccc_core.calculate_model_cost(self.scan(cache=cache)[0])[0]
+        pricing = {model_type: dict(rates) for model_type, rates in ccc_core.MODEL_PRICING.items()}
+        pricing['claude-sonnet-4'] = dict(pricing['claude-sonnet-4'], input_per_1M=30.0)
+        pricing['claude-foo'] = {'name': "Claude Foo", 'input_per_1M': 1.0, 'output_per_1M': 2.0,
+                                 'cache_write_per_1M': 3.0, 'cache_read_per_1M': 0.5}
+        ccc_core.use_pricing(pricing)
+        cached, expected = self.scan(cache=cache), self.scan()
+        self.assert_same_scan(cached, expected)
+        self.assertGreater(cached[0]['claude-foo']['count'], 0)
+        model_costs = ccc_core.calculate_model_cost(cached[0])
+        self.assertEqual(model_costs, ccc_core.calculate_model_cost(expected[0]))
+        self.assertGreater(model_costs[0]['claude-sonnet-4']['calculated_cost'], before['claude-sonnet-4']['calculated_cost'])
+
+class ParallelScanTest(CorpusTestCase):
+    TASKS = 60
+
+    def test_jobs_match_serial(self):
+        expected = self.scan(jobs=1)
+        for jobs in (2, 4):
+            with self.subTest(jobs=jobs):
+                self.assert_same_scan(self.scan(jobs=jobs), expected)
+
+    def test_jobs_fill_cache_like_serial(self):
+        expected = self.scan()
+        cache = self.open_cache()
+        self.assert_same_scan(self.scan(jobs=3, cache=cache), expected)
+        self.assert_same_scan(self.scan(jobs=1, cache=cache), expected)
+
+class ModelAttributionTest(unittest.TestCase):
+    def brute_force(self, record, models):
+        history = sorted(((ts if isinstance(ts, (int, float)) else 0, model_type) for ts, model_type in models),
+                         key=lambda usage: usage[0])
+        if record[0] is None:
+            return history[0][1]
+        active = [model_type for ts, model_type in history if ts <= record[0]]
+        return active[-1] if active else history[0][1]
+
+    def test_matches_linear_search(self):
+        rng = random.Random(9)
+        types = [model_type for model_type in ccc_core.MODEL_TYPES if model_type != 'other']
+        for case in range(300):
+            models = [(rng.choice([None, rng.randrange(0, 1000)]), rng.choice(types)) for _ in range(rng.randint(1, 6))]
+            records = [(rng.choice([None] + list(range(-5, 1005))), 1, 2, 3, 4, 0.5) for _ in range(20)]
+            with self.subTest(case=case, models=models):
+                attributed = ccc_core.attribute_records(records, models)
+                self.assertEqual([record[-1] for record in attributed],
+                                 [self.brute_force(record, models) for record in records])
+                self.assertEqual([record[:-1] for record in attributed], records)
+
+    def test_switch_at_request_time_applies(self):
+        models = [(100, 'claude-opus-4'), (0, 'claude-sonnet-4')]
+        records = [(99, 1, 1, 0, 0, 0.0), (100, 1, 1, 0, 0, 0.0)]
+        self.assertEqual([record[-1] for record in ccc_core.attribute_records(records, models)],
+                         ['claude-sonnet-4', 'claude-opus-4'])
+
+class ScanFilterTest(CorpusTestCase):
+    def filters(self):
+        middle = START_TS + self.TASKS * DAY_MS // 4
+        task_ids = [folder.name for folder in sorted(self.tasks.iterdir())[::3]]
+        return [
+            ccc_core.ScanFilter(since=middle),
+            ccc_core.ScanFilter(until=middle),
+            ccc_core.ScanFilter(since=middle - DAY_MS, until=middle + DAY_MS),
+            ccc_core.ScanFilter(workspace='proj1'),
+            ccc_core.ScanFilter(since=middle, workspace='proj2'),
+            ccc_core.ScanFilter(task_ids=task_ids, until=middle + 3 * DAY_MS),
+            ccc_core.ScanFilter(since=START_TS + 100 * DAY_MS)
+        ]
+
+    def post_filtered(self, scan_filter):
+        """Requests of a full scan that fall inside the filter, from each task's own parse"""
+        rows = []
+        for folder in sorted(self.tasks.iterdir()):
+            if scan_filter.task_ids is not None and folder.name not in scan_filter.task_ids:
+                continue
+            result = ccc_core.parse_task_folder(folder)
+            if result['status'] != 'ok' or not scan_filter.accepts_workspace(result['workspace']):
+                continue
+            rows.extend(record for record in result['records'] if record[0] is not None and scan_filter.accepts_ts(record[0]))
+        return sorted(rows)
+
+    def assert_matches_post_filtering(self, scan, scan_filter):
+        rows = sorted(tuple(row.values()) for row in scan[5])
+        self.assertEqual(rows, self.post_filtered(scan_filter))
+        self.assertEqual(scan[2], len(rows))
+        self.assertEqual(sum(totals['count'] for totals in scan[0].values()), len(rows))
+
+    def test_without_cache(self):
+        for scan_filter in self.filters():
+            with self.subTest(scan_filter=vars(scan_filter)):
+                self.assert_matches_post_filtering(self.scan(scan_filter=scan_filter), scan_filter)
+
+    def test_with_cold_and_warm_cache(self):
+        for scan_filter in self.filters():
+            with self.subTest(scan_filter=vars(scan_filter)):
+                cache = ccc_core.ScanCache(self.root / 'filtered.sqlite3', rebuild=True)
+                try:
+                    cold = self.scan(scan_filter=scan_filter, cache=cache)
+                    self.assert_matches_post_filtering(cold, scan_filter)
+                    self.assert_same_scan(self.scan(scan_filter=scan_filter, cache=cache), cold)
+                finally:
+                    cache.close()
+
+    def test_cache_filled_by_full_scan(self):
+        cache = self.open_cache()
+        self.scan(cache=cache)
+        for scan_filter in self.filters():
+            with self.subTest(scan_filter=vars(scan_filter)):
+                timings = ccc_core.PhaseTimings()
+                self.assert_matches_post_filtering(self.scan(scan_filter=scan_filter, cache=cache, timings=timings), scan_filter)
+                self.assertEqual(timings.counters.get('folders parsed', 0), 0)
+
+class LiveUsageTest(CorpusTestCase):
+    def assert_matches_scan(self, live_usage):
+        aggregator = ccc_core.UsageAggregator()
+        _, file_count, entry_count, skipped_count, _, request_data = ccc_core.calculate_token_usage(
+            self.tasks, silent=True, aggregator=aggregator)
+        self.assertEqual(live_usage.counts(), (file_count, skipped_count, entry_count))
+        self.assert_close(usage_dict(live_usage.aggregate()), usage_dict(aggregator))
+        self.assertEqual(sorted(map(tuple, map(dict.values, live_usage.request_table()))),
+                         sorted(map(tuple, map(dict.values, request_data))))
+        for name, sketch in aggregator.sketches.items():
+            self.assertEqual(live_usage.aggregate().sketches[name].count, sketch.count)
+
+    def assert_close(self, value, expected, path='usage'):
+        if isinstance(expected, dict):
+            self.assertEqual(set(value), set(expected), path)
+            for key in expected:
+                self.assert_close(value[key], expected[key], f"{path}.{key}")
+        elif isinstance(expected, list):
+            self.assertEqual(len(value), len(expected), path)
+            for i, (item, expected_item) in enumerate(zip(value, expected)):
+                self.assert_close(item, expected_item, f"{path}[{i}]")
+        elif isinstance(expected, float):
+            self.assertAlmostEqual(value, expected, places=6, msg=path)
+        else:
+            self.assertEqual(value, expected, path)
+
+    def refresh(self, live_usage, folder):
+        self.assertTrue(live_usage.refresh(folder))
+        self.assert_matches_scan(live_usage)
+
+    def test_append_rewrite_and_truncate(self):
+        live_usage = ccc_core.LiveUsage(self.tasks)
+        self.assert_matches_scan(live_usage)
+        rng = random.Random(6)
+        folders = [folder for folder in sorted(self.tasks.iterdir()) if live_usage.tasks[folder]['result']['status'] == 'ok']
+        for step in range(30):
+            folder = rng.choice(folders)
+            kind = ('append', 'rewrite last', 'truncate', 'append text')[step % 4]
+            with self.subTest(step=step, kind=kind, folder=folder.name):
+                if kind == 'append':
+                    self.rewrite(folder, lambda entries: entries + [make_request(entries[-1]['ts'] + i + 1, rng)
+                                                                    for i in range(rng.randint(1, 3))])
+                elif kind == 'rewrite last':
+                    # Cline fills in the usage of the last request once it completes
+                    self.rewrite(folder, lambda entries: entries[:-1] + [make_request(entries[-1]['ts'], rng)])
+                elif kind == 'truncate':
+                    self.rewrite(folder, lambda entries: entries[:max(1, len(entries) // 2)])
+                else:
+                    self.rewrite(folder, lambda entries: entries + [{'ts': entries[-1]['ts'] + 1, 'type': 'say', 'say': 'text',
+                                                                     'text': "done"}])
+                self.refresh(live_usage, folder)
+
+    def test_mid_write_is_retried(self):
+        live_usage = ccc_core.LiveUsage(self.tasks)
+        folder = sorted(self.tasks.iterdir())[4]
+        path = folder / 'ui_messages.json'
+        entries = json.loads(path.read_text())
+        entries.append(make_request(entries[-1]['ts'] + 1, random.Random(2)))
+        data = json.dumps(entries)
+        path.write_text(data[:-40])
+        self.assertFalse(live_usage.refresh(folder))
+        path.write_text(data)
+        self.refresh(live_usage, folder)
+
+    def test_tasks_added_and_removed(self):
+        live_usage = ccc_core.LiveUsage(self.tasks)
+        added = self.tasks / str(START_TS + 99 * DAY_MS)
+        write_task(added, *make_task(random.Random(3), START_TS + 99 * DAY_MS, 5))
+        self.assertEqual(live_usage.refresh_changed({added}), set())
+        self.assert_matches_scan(live_usage)
+        removed = sorted(self.tasks.iterdir())[2]
+        shutil.rmtree(removed)
+        self.assertEqual(live_usage.refresh_changed(None), set())
+        self.assert_matches_scan(live_usage)
+
+    def test_task_written_during_initial_scan(self):
+        target = sorted(self.tasks.iterdir())[6]
+        parse_task_folder = ccc_core.parse_task_folder
+
+        def parse_then_write(folder, **kwargs):
+            result = parse_task_folder(folder, **kwargs)
+            if folder == target:
+                self.rewrite(folder, lambda entries: entries + [make_request(entries[-1]['ts'] + 1, random.Random(4))])
+            return result
+        ccc_core.parse_task_folder = parse_then_write
+        try:
+            live_usage = ccc_core.LiveUsage(self.tasks)
+        finally:
+            ccc_core.parse_task_folder = parse_task_folder
+        self.refresh(live_usage, target)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+"""
+Tests of the ui_messages.json readers: the byte-level pre-filter
+(iter_api_req_entries_fast), its helpers and the structural scanner it falls
+back to, checked against json.load over generated files.
+"""
+import sys
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ccc_core
+
+CHUNK_SIZES = (1, 7, 16, 64, 1 << 20)
+
+def make_entries(count, seed=0, nested=False):
+    """Cline-like ui_messages.json entries, with text full of brackets, quotes and escaped `{"ts":` lookalikes"""
+    rng = random.Random(seed)
+    entries = []
+    ts = 1_735_000_000_000
+    for i in range(count):
+        ts += rng.randint(1, 90_000)
+        if rng.random() < 0.4:
+            request = {
+                'request': "<task>\n" + "x" * rng.randint(0, 300) + "\n</task>",
+                'tokensIn': rng.randint(1, 5000),
+                'tokensOut': rng.randint(1, 5000),
+                'cacheWrites': rng.randint(0, 50_000),
+                'cacheReads': rng.randint(0, 500_000),
+                'cost': rng.random()
+            }
+            entry = {'ts': ts, 'type': 'say', 'say': 'api_req_started', 'text': json.dumps(request)}
+        else:
+            text = rng.choice([
+                'plain text',
+                'a ] closing bracket } and "quotes"',
+                'json-ish {"ts": 1, "say": "api_req_started"} inside a string',
+                'unicode ✓ — ünïcödé',
+                '\\"escaped\\" backslashes \\\\',
+                'x' * rng.randint(0, 2000)
+            ])
+            entry = {'ts': ts, 'type': 'say', 'say': rng.choice(['text', 'tool', 'completion_result']), 'text': text}
+        if nested and i % 5 == 2:
+            entry['checkpoint'] = {'ts': ts - 1, 'hash': "abc"}
+        entries.append(entry)
+    return entries
+
+def api_entries(entries):
+    return [entry for entry in entries if entry.get('say') == 'api_req_started']
+
+def serialize(entries, indent=None):
+    """Bytes of a ui_messages.json array and the end offset of each entry in it"""
+    if indent is None:
+        parts = [json.dumps(entry, separators=(',', ':')).encode() for entry in entries]
+        opening, separator, closing = b'[', b',', b']'
+    else:
+        parts = [json.dumps(entry, indent=indent).replace('\n', '\n' + ' ' * indent).encode() for entry in entries]
+        opening, separator, closing = b'[\n' + b' ' * indent, b',\n' + b' ' * indent, b'\n]\n'
+    data = opening
+    ends = []
+    for i, part in enumerate(parts):
+        if i:
+            data += separator
+        data += part
+        ends.append(len(data))
+    return data + closing, ends
+
+class ScannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def write(self, data, name='ui_messages.json'):
+        path = Path(self._tmp.name) / name
+        path.write_bytes(data)
+        return path
+
+class FindEntryStartTest(unittest.TestCase):
+    def test_finds_last_opening_before_pos(self):
+        buffer = b'[{"ts":1,"a":2},{"ts":3,"b":4}]'
+        self.assertEqual(ccc_core.find_entry_start(buffer, len(buffer)), buffer.index(b'{"ts":3'))
+        self.assertEqual(ccc_core.find_entry_start(buffer, buffer.index(b'{"ts":3')), 1)
+        self.assertEqual(ccc_core.find_entry_start(buffer, 1), -1)
+
+    def test_skips_whitespace_before_key(self):
+        buffer = b'[\n  {\n    "ts": 1\n  }\n]'
+        self.assertEqual(ccc_core.find_entry_start(buffer, len(buffer)), buffer.index(b'{'))
+
+    def test_ignores_escaped_keys_in_strings(self):
+        buffer = b'[{"ts":1,"text":"{\\"ts\\": 2}"}]'
+        self.assertEqual(ccc_core.find_entry_start(buffer, len(buffer)), 1)
+
+    def test_ignores_ts_values(self):
+        self.assertEqual(ccc_core.find_entry_start(b'[{"a":"ts"}]', 12), -1)
+
+class IsClosedArrayTest(unittest.TestCase):
+    def test_closed(self):
+        self.assertTrue(ccc_core.is_closed_array(b'[{"ts":1,"say":"text"}]'))
+        self.assertTrue(ccc_core.is_closed_array(b'[\n  {\n    "ts": 1\n  }\n]\n'))
+        self.assertTrue(ccc_core.is_closed_array(b'[]'))
+        self.assertTrue(ccc_core.is_closed_array(b'  [ ]  '))
+
+    def test_cut_at_bracket_inside_string(self):
+        self.assertFalse(ccc_core.is_closed_array(b'[{"ts":1,"text":"a]'))
+        self.assertFalse(ccc_core.is_closed_array(b'[{"ts":1,"text":"a"},{"ts":2,"text":"b]'))
+
+    def test_missing_bracket(self):
+        self.assertFalse(ccc_core.is_closed_array(b'[{"ts":1,"text":"a"}'))
+        self.assertFalse(ccc_core.is_closed_array(b'[{"ts":1,"text":"a"},'))
+        self.assertFalse(ccc_core.is_closed_array(b'['))
+
+class FastReaderTest(ScannerTestCase):
+    def assert_matches_json_load(self, path, **kwargs):
+        with open(path, 'rb') as f:
+            expected = api_entries(json.load(f))
+        data = path.read_bytes()
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size):
+                found = list(ccc_core.iter_api_req_entries_fast(path, chunk_size, **kwargs))
+                self.assertEqual([entry for _, entry in found], expected)
+                for offset, entry in found:
+                    self.assertEqual(json.JSONDecoder().raw_decode(data[offset:].decode())[0], entry)
+
+    def test_compact(self):
+        self.assert_matches_json_load(self.write(serialize(make_entries(200, seed=1))[0]))
+
+    def test_pretty_printed(self):
+        self.assert_matches_json_load(self.write(serialize(make_entries(200, seed=2), indent=2)[0]))
+
+    def test_empty_array(self):
+        self.assert_matches_json_load(self.write(b'[]'))
+
+    def test_match_split_across_chunks(self):
+        entries = [{'ts': 1, 'say': 'text', 'text': 'x' * 40}, {'ts': 2, 'say': 'api_req_started', 'text': '{}'}]
+        data = serialize(entries)[0]
+        split = data.index(ccc_core.API_REQ_STARTED) + 5
+        path = self.write(data)
+        # Every chunk size putting a chunk boundary inside the match or the entry opening
+        for chunk_size in range(1, split + 1):
+            with self.subTest(chunk_size=chunk_size):
+                found = [entry for _, entry in ccc_core.iter_api_req_entries_fast(path, chunk_size)]
+                self.assertEqual(found, entries[1:])
+
+    def test_resume_from_offset(self):
+        entries = make_entries(100, seed=3)
+        path = self.write(serialize(entries)[0])
+        found = list(ccc_core.iter_api_req_entries_fast(path))
+        offset = found[len(found) // 2][0]
+        resumed = [entry for _, entry in ccc_core.iter_api_req_entries_fast(path, 16, offset=offset)]
+        self.assertEqual(resumed, [entry for _, entry in found[len(found) // 2:]])
+
+    def test_not_an_array(self):
+        for data in (b'{"ts": 1}', b'', b'  \n'):
+            with self.subTest(data=data):
+                with self.assertRaises(json.JSONDecodeError) as raised:
+                    list(ccc_core.iter_api_req_entries_fast(self.write(data)))
+                self.assertNotIsInstance(raised.exception, ccc_core.TruncatedJSONError)
+
+    def test_no_complete_entry_is_invalid(self):
+        for data in (b'[', b'[\n  ', b'[{"ts":1,"say":"text","te', '[{"ts":1,"text":"é'.encode()[:-1]):
+            for reader in (ccc_core.iter_api_req_entries_fast, ccc_core.iter_api_req_entries):
+                with self.subTest(data=data, reader=reader.__name__):
+                    with self.assertRaises(json.JSONDecodeError) as raised:
+                        list(reader(self.write(data), 4))
+                    self.assertNotIsInstance(raised.exception, ccc_core.TruncatedJSONError)
+
+    def test_complete_entry_without_bracket_is_truncated(self):
+        for data in (b'[{"ts":1,"say":"text","text":"a"}', b'[{"ts":1,"say":"text","text":"a"},',
+                     b'[{"ts":1,"say":"text","text":"a"},{"ts":2,"say":"te'):
+            for reader in (ccc_core.iter_api_req_entries_fast, ccc_core.iter_api_req_entries):
+                with self.subTest(data=data, reader=reader.__name__):
+                    with self.assertRaises(ccc_core.TruncatedJSONError):
+                        list(reader(self.write(data), 4))
+
+    def test_undecodable_bytes(self):
+        for data in (b'[\xff\xfe]', b'[{"ts":1,"say":"text","text":"\xff"}]', b'[{"ts":1,"say":"text","text":"\xff"'):
+            with self.subTest(data=data):
+                with self.assertRaises(UnicodeDecodeError):
+                    ccc_core.read_api_req_entries(self.write(data))
+
+    def test_nested_ts_objects_raise_layout_error(self):
+        path = self.write(serialize(make_entries(50, seed=4, nested=True))[0])
+        with self.assertRaises(ccc_core.EntryLayoutError):
+            list(ccc_core.iter_api_req_entries_fast(path))
+
+class TruncationTest(ScannerTestCase):
+    def assert_prefix_recovered(self, entries, indent=None):
+        data, ends = serialize(entries, indent)
+        expected_api = set(i for i, entry in enumerate(entries) if entry.get('say') == 'api_req_started')
+        full = data.rstrip()
+        # Every cut over the last few entries, including right after an entry and right before the `]`
+        for cut in range(ends[-4] - 1, len(full)):
+            path = self.write(full[:cut])
+            complete = [entries[i] for i in sorted(expected_api) if ends[i] <= cut]
+            for chunk_size in (16, 1 << 20):
+                with self.subTest(cut=cut, chunk_size=chunk_size):
+                    found = []
+                    with self.assertRaises(ccc_core.TruncatedJSONError):
+                        for _, entry in ccc_core.iter_api_req_entries_fast(path, chunk_size):
+                            found.append(entry)
+                    self.assertEqual(found, complete)
+                    with self.assertRaises(ccc_core.TruncatedJSONError) as raised:
+                        ccc_core.read_api_req_entries(path, chunk_size)
+                    self.assertEqual(raised.exception.entries, complete)
+        self.assertEqual([entry for _, entry in ccc_core.iter_api_req_entries_fast(self.write(full))],
+                         api_entries(entries))
+
+    def test_compact_tail(self):
+        entries = make_entries(30, seed=5)
+        entries[-1] = {'ts': entries[-2]['ts'] + 1, 'say': 'api_req_started', 'text': '{"cost": 0.5, "note": "a ] b"}'}
+        self.assert_prefix_recovered(entries)
+
+    def test_pretty_printed_tail(self):
+        entries = make_entries(30, seed=6)
+        entries[-1] = {'ts': entries[-2]['ts'] + 1, 'say': 'api_req_started', 'text': '{"cost": 0.5}'}
+        self.assert_prefix_recovered(entries, indent=2)
+
+    def test_only_closing_bracket_missing(self):
+        entries = [{'ts': 1, 'say': 'api_req_started', 'text': '{}'}, {'ts': 2, 'say': 'api_req_started', 'text': '{}'}]
+        path = self.write(serialize(entries)[0][:-1])
+        with self.assertRaises(ccc_core.TruncatedJSONError) as raised:
+            ccc_core.read_api_req_entries(path)
+        self.assertEqual(raised.exception.entries, entries)
+
+class StructuralScannerTest(ScannerTestCase):
+    def test_matches_json_load(self):
+        for seed, indent, nested in ((7, None, False), (8, 2, False), (9, None, True), (10, 4, True)):
+            entries = make_entries(150, seed=seed, nested=nested)
+            path = self.write(serialize(entries, indent)[0])
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(seed=seed, chunk_size=chunk_size):
+                    self.assertEqual(list(ccc_core.iter_api_req_entries(path, chunk_size)), api_entries(entries))
+
+    def test_truncated(self):
+        entries = make_entries(40, seed=11, nested=True)
+        data, ends = serialize(entries)
+        cut = ends[-2] + 3
+        expected = [entry for entry, end in zip(entries, ends) if end <= cut and entry.get('say') == 'api_req_started']
+        found = []
+        with self.assertRaises(ccc_core.TruncatedJSONError):
+            for entry in ccc_core.iter_api_req_entries(self.write(data[:cut]), 16):
+                found.append(entry)
+        self.assertEqual(found, expected)
+
+    def test_fallback_from_fast_reader(self):
+        entries = make_entries(120, seed=12, nested=True)
+        path = self.write(serialize(entries, 2)[0])
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(ccc_core.read_api_req_entries(path, chunk_size), api_entries(entries))
+
+    def test_fallback_keeps_truncated_prefix(self):
+        entries = make_entries(60, seed=13, nested=True)
+        data, ends = serialize(entries)
+        cut = ends[-3] + 10
+        with self.assertRaises(ccc_core.TruncatedJSONError) as raised:
+            ccc_core.read_api_req_entries(self.write(data[:cut]), 64)
+        self.assertEqual(raised.exception.entries,
+                         [entry for entry, end in zip(entries, ends) if end <= cut and entry.get('say') == 'api_req_started'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Tests of the usage statistics: QuantileSketch accuracy and merging, and the
+rolling spend windows, checked against exact quantiles and brute-force sums.
+"""
+import sys
+import random
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ccc_core
+
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+def exact_quantile(values, q):
+    """The value QuantileSketch.quantile estimates: rank q * (count - 1) of the sorted values"""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+def sketch_of(values):
+    sketch = ccc_core.QuantileSketch()
+    sketch.update(values)
+    return sketch
+
+class QuantileSketchTest(unittest.TestCase):
+    def distributions(self):
+        rng = random.Random(19)
+        return {
+            'uniform': [rng.uniform(0, 1000) for _ in range(5000)],
+            'lognormal': [rng.lognormvariate(8, 2) for _ in range(5000)],
+            'integers with zeros': [rng.choice([0, 0, rng.randint(1, 200_000)]) for _ in range(5000)],
+            'tiny costs': [rng.random() / 1000 for _ in range(2000)],
+            'single value': [42.0] * 100
+        }
+
+    def assert_accurate(self, sketch, values):
+        self.assertEqual(sketch.count, len(values))
+        self.assertAlmostEqual(sketch.sum, sum(values), delta=1e-9 * max(1.0, sum(values)))
+        for q in QUANTILES:
+            expected = exact_quantile(values, q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected), ccc_core.QuantileSketch.RELATIVE_ACCURACY * expected + 1e-12,
+                                 f"q={q}")
+
+    def test_quantiles_within_relative_accuracy(self):
+        for name, values in self.distributions().items():
+            with self.subTest(distribution=name):
+                self.assert_accurate(sketch_of(values), values)
+
+    def test_merge_matches_single_sketch(self):
+        for name, values in self.distributions().items():
+            for parts in (2, 7):
+                with self.subTest(distribution=name, parts=parts):
+                    merged = ccc_core.QuantileSketch()
+                    for i in range(parts):
+                        merged.merge(sketch_of(values[i::parts]))
+                    whole = sketch_of(values)
+                    self.assertEqual(merged.buckets, whole.buckets)
+                    self.assertEqual((merged.zero_count, merged.count, merged.min, merged.max),
+                                     (whole.zero_count, whole.count, whole.min, whole.max))
+                    self.assert_accurate(merged, values)
+
+    def test_remove_takes_values_back(self):
+        values = self.distributions()['lognormal']
+        sketch = sketch_of(values)
+        sketch.remove(values[1000:])
+        self.assertEqual(sketch.buckets, sketch_of(values[:1000]).buckets)
+        self.assert_accurate(sketch, values[:1000])
+
+    def test_round_trip_and_empty(self):
+        values = self.distributions()['integers with zeros']
+        sketch = ccc_core.QuantileSketch.from_dict(sketch_of(values).to_dict())
+        self.assert_accurate(sketch, values)
+        self.assertIsNone(ccc_core.QuantileSketch().quantile(0.5))
+
+    def test_bucket_count_stays_bounded(self):
+        rng = random.Random(5)
+        values = [10 ** rng.uniform(-12, 12) for _ in range(20_000)]
+        sketch = sketch_of(values)
+        self.assertLessEqual(len(sketch.buckets), ccc_core.QuantileSketch.MAX_BUCKETS)
+        # Collapsing folds the lowest buckets, so the upper quantiles keep their accuracy
+        for q in (0.5, 0.9, 0.99):
+            expected = exact_quantile(values, q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected), ccc_core.QuantileSketch.RELATIVE_ACCURACY * expected)
+
+class RollingWindowTest(unittest.TestCase):
+    def request_data(self, seed, count, span_ms):
+        rng = random.Random(seed)
+        types = [model_type for model_type in ccc_core.MODEL_TYPES if model_type != 'other']
+        request_data = ccc_core.RequestTable()
+        for ts in rng.sample(range(1_735_000_000_000, 1_735_000_000_000 + span_ms), count):
+            request_data.append(ts, rng.randint(1, 5000), rng.randint(1, 5000), rng.randint(0, 50_000),
+                                rng.randint(0, 500_000), rng.random(), rng.choice(types))
+        return request_data
+
+    def model_costs(self, request_data):
+        model_totals = {}
+        for row in request_data:
+            totals = model_totals.setdefault(row['model_type'], {'tokensIn': 0, 'tokensOut': 0, 'cacheWrites': 0, 'cacheReads': 0,
+                                                                 'cost': 0.0, 'count': 0})
+            totals['count'] += 1
+        return ccc_core.calculate_model_cost(model_totals)[0]
+
+    def brute_force(self, requests, span, now_ms):
+        """Current and busiest window sums from every request's window, summed directly"""
+        def window(end_ts):
+            inside = [request for request in requests if end_ts - span < request[0] <= end_ts]
+            return sum(request[1] for request in inside), len(inside), sum(request[2] for request in inside)
+        peak = max((window(request[0]) for request in requests), default=(0.0, 0, 0))
+        return window(now_ms), peak
+
+    def test_matches_brute_force(self):
+        for seed, count, span_ms in ((1, 300, 3 * 86_400_000), (2, 500, 40 * 86_400_000), (3, 40, 2 * 3_600_000), (4, 0, 1)):
+            request_data = self.request_data(seed, count, span_ms)
+            model_costs = self.model_costs(request_data)
+            costs = request_data.priced_costs(model_costs) if count else []
+            requests = [(row['timestamp'], cost, row['tokensIn'] + row['tokensOut']) for row, cost in zip(request_data, costs)]
+            timestamps = sorted(request[0] for request in requests) or [1_735_000_000_000]
+            for end_ts in (timestamps[len(timestamps) // 2], timestamps[-1] + 3_600_000):
+                now = datetime.fromtimestamp(end_ts / 1000)
+                rolling = ccc_core.calculate_rolling_windows(request_data, model_costs, now=now)
+                # The windows end at now in milliseconds, truncated as calculate_rolling_windows does
+                now_ms = int(now.timestamp() * 1000)
+                for (label, span), window in zip(ccc_core.ROLLING_WINDOWS, rolling['windows']):
+                    with self.subTest(seed=seed, now=now_ms, window=label):
+                        current, peak = self.brute_force(requests, span, now_ms)
+                        self.assertAlmostEqual(window['current_cost'], current[0], places=9)
+                        self.assertEqual((window['current_requests'], window['current_tokens']), current[1:])
+                        self.assertAlmostEqual(window['peak_cost'], peak[0], places=9)
+                        if count:
+                            # The reported peak bounds hold the reported totals
+                            inside = [request for request in requests
+                                      if window['peak_start_ts'] <= request[0] <= window['peak_end_ts']]
+                            self.assertGreater(window['peak_start_ts'], window['peak_end_ts'] - span)
+                            self.assertEqual(len(inside), window['peak_requests'])
+                            self.assertEqual(sum(request[2] for request in inside), window['peak_tokens'])
+
+    def test_forecast(self):
+        request_data = self.request_data(6, 400, 60 * 86_400_000)
+        model_costs = self.model_costs(request_data)
+        costs = request_data.priced_costs(model_costs)
+        now = datetime.fromtimestamp(max(request_data.timestamp) / 1000 - 86_400)
+        rolling = ccc_core.calculate_rolling_windows(request_data, model_costs, now=now)
+        now_ms = int(now.timestamp() * 1000)
+        month_start_ms = int(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+        month_to_date = sum(cost for ts, cost in zip(request_data.timestamp, costs) if month_start_ms <= ts <= now_ms)
+        last_week = sum(cost for ts, cost in zip(request_data.timestamp, costs) if now_ms - 7 * 86_400_000 < ts <= now_ms)
+        forecast = rolling['forecast']
+        self.assertEqual(forecast['month'], now.strftime('%Y-%m'))
+        self.assertAlmostEqual(forecast['month_to_date'], month_to_date, places=9)
+        self.assertAlmostEqual(forecast['daily_rate'], last_week / 7, places=9)
+        self.assertAlmostEqual(forecast['month_end'], month_to_date + last_week / 7 * forecast['days_left'], places=9)
+
+if __name__ == '__main__':
+    unittest.main()